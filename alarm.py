@@ -0,0 +1,141 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+import numpy as np
+import pygame
+
+# Higher wins: while it sounds, lower-priority alarms are ducked
+DEFAULT_PRIORITIES = {'drowsiness': 3, 'phone': 2, 'yawning': 1}
+
+
+class AlarmService:
+    """
+    Alarm playback with every sound decoded once into memory and a reserved mixer
+    channel per alert type. play() returns immediately; a single scheduler thread
+    stops sounds after their duration and plays repeats, so no thread is started
+    per alarm. Re-triggering an alarm that is still sounding extends it instead of
+    restarting it. While an alarm sounds, alarms of lower priority play at
+    `duck_volume`.
+
+    `sounds` maps alert type to a WAV path or an int16 sample array (mono or
+    matching the mixer's channels). Paths that do not exist are skipped.
+    """
+
+    def __init__(self, sounds, priorities=None, duration=3.0, duck_volume=0.3):
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        self.duration = duration
+        self.duck_volume = duck_volume
+        self.priorities = dict(DEFAULT_PRIORITIES, **(priorities or {}))
+        self.sounds = {}
+        decoded = {}
+        for alert_type, source in sounds.items():
+            # Alert types sharing a file share its decoded samples
+            key = source if isinstance(source, str) else id(source)
+            if key not in decoded:
+                decoded[key] = self._load(source)
+            if decoded[key] is not None:
+                self.sounds[alert_type] = decoded[key]
+        # Reserved channels are never taken by other pygame.mixer.Sound.play() calls
+        count = len(self.sounds)
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), count))
+        pygame.mixer.set_reserved(count)
+        self.channels = {alert_type: pygame.mixer.Channel(i) for i, alert_type in enumerate(self.sounds)}
+        self.played = dict.fromkeys(self.sounds, 0)
+        self._stop_at = {}
+        self._events = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._schedule, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _load(source):
+        if isinstance(source, np.ndarray):
+            _, _, channels = pygame.mixer.get_init()
+            samples = source.astype(np.int16, copy=False)
+            if samples.ndim == 1 and channels > 1:
+                samples = np.repeat(samples[:, None], channels, axis=1)
+            return pygame.sndarray.make_sound(np.ascontiguousarray(samples))
+        if os.path.exists(source):
+            return pygame.mixer.Sound(source)
+        return None
+
+    def play(self, alert_type, duration=None, repeat=0, interval=4.0):
+        """
+        Sound `alert_type` for `duration` seconds (default: the service's), then
+        `repeat` more times every `interval` seconds. Returns False if the type has
+        no sound.
+        """
+        if alert_type not in self.sounds:
+            return False
+        now = time.monotonic()
+        with self._cond:
+            self._start(alert_type, now, duration or self.duration)
+            for i in range(1, repeat + 1):
+                self._push(now + i * interval, 'play', alert_type, duration or self.duration)
+            self._cond.notify()
+        return True
+
+    def stop(self, alert_type=None):
+        """Silence one alert type, or all of them."""
+        with self._cond:
+            for name in ([alert_type] if alert_type else list(self.channels)):
+                self._stop_at.pop(name, None)
+                self._events = [e for e in self._events if e[3] != name]
+                heapq.heapify(self._events)
+                self.channels[name].stop()
+            self._apply_ducking()
+
+    def close(self):
+        self.stop()
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+
+    def _push(self, at, action, alert_type, arg=None):
+        heapq.heappush(self._events, (at, next(self._counter), action, alert_type, arg))
+
+    def _start(self, alert_type, now, duration):
+        channel = self.channels[alert_type]
+        stop_at = now + duration
+        if channel.get_busy() and alert_type in self._stop_at:
+            # Still sounding: extend rather than restart
+            self._stop_at[alert_type] = max(self._stop_at[alert_type], stop_at)
+        else:
+            channel.play(self.sounds[alert_type], loops=-1)
+            self._stop_at[alert_type] = stop_at
+            self.played[alert_type] += 1
+        self._push(self._stop_at[alert_type], 'stop', alert_type)
+        self._apply_ducking()
+
+    def _apply_ducking(self):
+        sounding = [name for name in self._stop_at if self.channels[name].get_busy()]
+        top = max((self.priorities.get(name, 0) for name in sounding), default=0)
+        for name, channel in self.channels.items():
+            channel.set_volume(1.0 if self.priorities.get(name, 0) >= top else self.duck_volume)
+
+    def _schedule(self):
+        with self._cond:
+            while self._running:
+                if not self._events:
+                    self._cond.wait()
+                    continue
+                at, _, action, alert_type, arg = self._events[0]
+                now = time.monotonic()
+                if at > now:
+                    self._cond.wait(at - now)
+                    continue
+                heapq.heappop(self._events)
+                if action == 'play':
+                    self._start(alert_type, now, arg)
+                elif self._stop_at.get(alert_type) == at:
+                    # Stale stop events (the alarm was extended) are ignored
+                    del self._stop_at[alert_type]
+                    self.channels[alert_type].stop()
+                    self._apply_ducking()
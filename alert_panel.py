@@ -0,0 +1,60 @@
+import time
+
+import streamlit as st
+
+ALERT_CARDS = {
+    'drowsiness': ("😴 Drowsiness Detected", "Please stay alert!"),
+    'yawning': ("🥱 Yawning Detected", "Take a break if needed!"),
+    'phone': ("📱 Phone Detected", "Focus on driving!"),
+}
+
+SAFE_CARD = """
+<div class="safe-card">
+    <h3 style="margin: 0;">✅ Alert</h3>
+    <p style="margin: 0.5rem 0; opacity: 0.9;">Stay focused!</p>
+</div>
+"""
+
+
+def alert_card(alert_type):
+    title, message = ALERT_CARDS[alert_type]
+    return f"""
+<div class="alert-card">
+    <h3 style="margin: 0;">{title}</h3>
+    <p style="margin: 0.5rem 0; opacity: 0.9;">{message}</p>
+</div>
+"""
+
+
+class AlertPanel:
+    """
+    One card per alert type, re-sent to the browser only when that alert changes
+    state. A card keeps its state for at least `min_hold` seconds, so an alert that
+    flickers between frames does not flood the websocket.
+
+    Create it once per script run (its placeholders belong to that run) and call
+    update() from the polling fragment.
+    """
+
+    def __init__(self, alert_types=tuple(ALERT_CARDS), min_hold=1.0):
+        self.min_hold = min_hold
+        self.updates = 0
+        self._placeholders = dict(zip(alert_types, (col.empty() for col in st.columns(len(alert_types)))))
+        self._shown = {}
+
+    def update(self, alerts, now=None):
+        """Render the cards whose state changed. Returns the number of cards sent."""
+        now = time.monotonic() if now is None else now
+        sent = 0
+        for alert_type, placeholder in self._placeholders.items():
+            active = bool(alerts.get(alert_type))
+            shown = self._shown.get(alert_type)
+            if shown is not None:
+                state, since = shown
+                if state == active or now - since < self.min_hold:
+                    continue
+            placeholder.markdown(alert_card(alert_type) if active else SAFE_CARD, unsafe_allow_html=True)
+            self._shown[alert_type] = (active, now)
+            sent += 1
+        self.updates += sent
+        return sent
@@ -1,30 +1,48 @@
 import streamlit as st
-import cv2
-import mediapipe as mp
-import numpy as np
-from detector.drowsiness import get_ear
-from detector.yawn import is_yawning
-from detector.phone_detector import detect_phone
+from detector.phone_detector import PHONE_MODEL
+from detector.landmark_tracker import FACE_MESH
+from detector.models import registry
+from detector.quality import QualityController, QUALITY_LEVELS
+from detector.session import MonitoringSession, ALERT_TYPES
+from detector.alerts import AlertEngine
+from alert_panel import AlertPanel
+from alarm import AlarmService
+from generate_alarm import alarm_tone, ALERT_TONES
 import pandas as pd
 from datetime import datetime
 import time
-import pygame
-import threading
 import os
 import streamlit_authenticator as stauth
 from db import (
     get_user, create_user, update_user, get_all_drivers, get_all_managers,
     get_unassigned_drivers, assign_driver_to_manager, get_drivers_for_manager,
-    log_ride, get_rides_for_driver, get_all_rides, log_trip, get_trips_for_driver
+    log_ride_async, get_ride_writer, get_rides_for_driver, get_all_rides, log_trip, get_trips_for_driver, end_trip
 )
-from bson import ObjectId
 from fpdf import FPDF
 
-# Initialize pygame mixer for sound
-pygame.mixer.init()
+# Monitoring tuning is deployment configuration, like PHONE_DETECTOR_BACKEND, not a driver setting
+def _env_flag(name, default):
+    return os.environ.get(name, str(int(default))).lower() not in ('0', 'false', 'no', 'off')
 
-# Alert sound path - using relative path
-alert_path = "alert.wav"
+MONITOR_PIPELINED = _env_flag("MONITOR_PIPELINED", True)  # capture, detection and rendering on separate stages
+MONITOR_CROP_PHONE_ROI = _env_flag("MONITOR_CROP_PHONE_ROI", True)  # YOLO on the driver region only
+MONITOR_TRACK_LANDMARKS = _env_flag("MONITOR_TRACK_LANDMARKS", True)  # optical flow between FaceMesh keyframes
+MONITOR_REUSE_BUFFERS = _env_flag("MONITOR_REUSE_BUFFERS", True)  # preallocated frame buffers
+MONITOR_ADAPTIVE_QUALITY = _env_flag("MONITOR_ADAPTIVE_QUALITY", True)  # step quality down to meet the deadline
+MONITOR_FRAME_DEADLINE_MS = int(os.environ.get("MONITOR_FRAME_DEADLINE_MS", "66"))
+
+
+def stop_monitoring():
+    # Blocks until the worker has released the camera, so it can be reopened right away
+    session = st.session_state.get('monitoring_session')
+    if session is not None:
+        session.stop()
+        st.session_state.monitoring_session = None
+
+@st.cache_resource
+def get_alarm_service():
+    # One mixer and one distinct synthesized tone per alert type per process, not per rerun
+    return AlarmService({alert_type: alarm_tone(**ALERT_TONES[alert_type]) for alert_type in ALERT_TYPES})
 
 # --- PDF GENERATION ---
 def generate_trip_pdf(trip, events):
@@ -123,6 +141,10 @@ def generate_trip_pdf(trip, events):
                 if details_text:
                     details_text += " | "
                 details_text += f"EAR: {event['ear_value']}"
+            if 'duration_s' in event:
+                if details_text:
+                    details_text += " | "
+                details_text += f"Duration: {event['duration_s']} s ({event.get('frames', 1)} frames)"
             
             if details_text:
                 pdf.cell(0, 6, txt=details_text, ln=True, fill=True)
@@ -911,6 +933,7 @@ if st.session_state.current_page == 'dashboard':
         col1, col2, col3 = st.columns([1, 4, 1])
         with col1:
             if st.button('⬅️ Back to Login', key='driver_main_back_btn'):
+                stop_monitoring()
                 st.session_state.logged_in = False
                 st.session_state.role = None
                 st.session_state.username = None
@@ -985,191 +1008,167 @@ if st.session_state.current_page == 'dashboard':
                 </div>
                 """, unsafe_allow_html=True)
                 
-                # --- ALERT FUNCTIONS (KEEPING ALL FUNCTIONALITY INTACT) ---
-                def play_alarm_for_duration():
-                    if os.path.exists(alert_path):
-                        try:
-                            alarm_sound = pygame.mixer.Sound(alert_path)
-                            alarm_sound.play()
-                            def stop_alarm():
-                                time.sleep(3)
-                                alarm_sound.stop()
-                            threading.Thread(target=stop_alarm, daemon=True).start()
-                        except Exception as e:
-                            st.error(f"Error playing alert sound: {str(e)}")
-                
-                def check_alert_duration(alert_type, is_detected):
-                    current_time = time.time()
-                    timer = st.session_state.alert_timers[alert_type]
-                    if is_detected:
-                        if timer['start_time'] is None:
-                            timer['start_time'] = current_time
-                            timer['alert_played'] = False
-                        elif not timer['alert_played'] or (current_time - timer['start_time']) >= 4:
-                            play_alarm_for_duration()
-                            timer['alert_played'] = True
-                            timer['start_time'] = current_time
-                    else:
-                        timer['start_time'] = None
-                        timer['alert_played'] = False
-                
-                # Monitoring UI
-                if 'alert_timers' not in st.session_state:
-                    st.session_state.alert_timers = {
-                        'drowsiness': {'start_time': None, 'alert_played': False},
-                        'yawning': {'start_time': None, 'alert_played': False},
-                        'phone': {'start_time': None, 'alert_played': False}
-                    }
+                # Alert timing (alarm on the second consecutive detection, repeat every 4 s)
+                # lives in an AlertEngine that outlives reruns, keyed by trip
+                if 'alert_engine' not in st.session_state:
+                    st.session_state.alert_engine = AlertEngine()
                 
                 # Enhanced Alert Display
                 st.markdown('<div class="section-header">📊 Real-Time Monitoring</div>', unsafe_allow_html=True)
                 
-                col1, col2, col3 = st.columns(3)
-                drowsiness_alert = col1.empty()
-                yawn_alert = col2.empty()
-                phone_alert = col3.empty()
+                # Cards are only re-sent when an alert changes state (held for at least 1 s);
+                # the page polls the monitoring session instead of rendering from inside its loop
+                alert_panel = AlertPanel(ALERT_TYPES, min_hold=1.0)
                 
+                @st.fragment(run_every=0.2)
+                def poll_alerts():
+                    session = st.session_state.get('monitoring_session')
+                    if session is not None:
+                        # Keeps the session alive while this page is open
+                        session.heartbeat()
+                    alerts = session.snapshot()['alerts'] if session else dict.fromkeys(ALERT_TYPES, False)
+                    alert_panel.update(alerts)
                 
+                poll_alerts()
                 
+                # A session can end on its own: the camera failed or stopped, or the page went
+                # quiet long enough for the idle watchdog. It is replaced rather than left frozen.
+                session = st.session_state.get('monitoring_session')
+                if session is not None and not session.running:
+                    error = session.error
+                    stop_monitoring()
+                    if error is not None:
+                        # Reopening a failing camera on every rerun would not help; the driver retries
+                        st.session_state.camera_checkbox = False
+                        st.session_state.monitoring_error = str(error)
+                    else:
+                        st.warning("⚠️ Monitoring paused while the page was inactive and has been restarted")
+                camera_status = st.empty()
                 run = st.checkbox('🎥 Start Camera', key='camera_checkbox')
+                if run:
+                    st.session_state.monitoring_error = None
+                elif st.session_state.get('monitoring_error'):
+                    camera_status.error(f"🎥 Camera monitoring stopped: {st.session_state.monitoring_error}. Tick Start Camera to retry.")
+                # Detection runs at full rate; the live view is a throttled, downsized JPEG
+                preview_fps = st.select_slider('🖼️ Preview rate (fps)', options=[2, 5, 10, 15], value=10, key='preview_fps_slider')
+                preview_width = st.select_slider('📐 Preview width (px)', options=[320, 480, 640], value=480, key='preview_width_slider')
+                mjpeg_preview = st.checkbox('📡 Serve the preview as MJPEG on localhost:8765', value=False, key='mjpeg_preview_checkbox')
                 
                 # KEEPING ALL CAMERA FUNCTIONALITY INTACT
-                mp_face_mesh = mp.solutions.face_mesh
-                LEFT_EYE = [362, 385, 387, 263, 373, 380]
-                RIGHT_EYE = [33, 160, 158, 133, 153, 144]
+                # Load and warm up the models in the background while the driver gets ready;
+                # they are shared by every session in this process
+                registry.preload(FACE_MESH, PHONE_MODEL)
+                if registry.timings:
+                    st.caption("🧠 " + " · ".join(
+                        f"{name}: load {t['load_s'] * 1000:.0f} ms, warm-up {t['warmup_s'] * 1000:.0f} ms"
+                        for name, t in registry.timings.items()
+                    ))
                 
-                if run:
-                    cap = cv2.VideoCapture(0)
-                    stframe = st.empty()
-                    with mp_face_mesh.FaceMesh(refine_landmarks=True) as face_mesh:
-                        while cap.isOpened():
-                            ret, frame = cap.read()
-                            if not ret:
-                                break
-                            frame = cv2.flip(frame, 1)
-                            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                            results = face_mesh.process(rgb)
-                            drowsiness_detected = False
-                            yawning_detected = False
-                            phone_detected = False
-                            if results.multi_face_landmarks:
-                                for face_landmarks in results.multi_face_landmarks:
-                                    h, w, _ = frame.shape
-                                    landmarks = np.array([(lm.x * w, lm.y * h) for lm in face_landmarks.landmark])
-                                    left_eye = landmarks[LEFT_EYE]
-                                    right_eye = landmarks[RIGHT_EYE]
-                                    ear = (get_ear(left_eye) + get_ear(right_eye)) / 2.0
-                                    if ear < 0.20:
-                                        drowsiness_detected = True
-                                        cv2.putText(frame, "DROWSINESS ALERT", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 3)
-                                        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                                        log_ride({
-                                            'timestamp': current_time,
-                                            'event_type': 'Drowsiness',
-                                            'ear_value': round(ear, 3),
-                                            'driver': st.session_state.username,
-                                            'trip_id': st.session_state.current_trip_id
-                                        })
-                                    # Yawn detection with debug
-                                    if st.session_state.get('debug_yawn', False):
-                                        is_yawn, mouth_ratio, mouth_distance, face_width = is_yawning(landmarks, debug=True)
-                                        st.sidebar.write(f"Yawn debug: ratio={mouth_ratio:.3f}, dist={mouth_distance:.1f}, width={face_width:.1f}")
-                                        if is_yawn:
-                                            yawning_detected = True
-                                            cv2.putText(frame, "YAWNING", (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 0, 0), 3)
-                                            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                                            log_ride({
-                                                'timestamp': current_time,
-                                                'event_type': 'Yawning',
-                                                'details': f'Mouth ratio: {mouth_ratio:.3f}, dist: {mouth_distance:.1f}, width: {face_width:.1f}',
-                                                'driver': st.session_state.username,
-                                                'trip_id': st.session_state.current_trip_id
-                                            })
-                                    else:
-                                        if is_yawning(landmarks):
-                                            yawning_detected = True
-                                            cv2.putText(frame, "YAWNING", (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 0, 0), 3)
-                                            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                                            log_ride({
-                                                'timestamp': current_time,
-                                                'event_type': 'Yawning',
-                                                'details': 'Mouth distance exceeded threshold',
-                                                'driver': st.session_state.username,
-                                                'trip_id': st.session_state.current_trip_id
-                                            })
-                            if detect_phone(frame):
-                                phone_detected = True
-                                cv2.putText(frame, "MOBILE PHONE DETECTED", (20, 120), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 255), 3)
-                                current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                                log_ride({
-                                    'timestamp': current_time,
-                                    'event_type': 'Phone Usage',
-                                    'details': 'Mobile phone detected in frame',
-                                    'driver': st.session_state.username,
-                                    'trip_id': st.session_state.current_trip_id
-                                })
-                            check_alert_duration('drowsiness', drowsiness_detected)
-                            check_alert_duration('yawning', yawning_detected)
-                            check_alert_duration('phone', phone_detected)
-                            
-                            # Enhanced Alert Display
-                            if drowsiness_detected:
-                                drowsiness_alert.markdown("""
-                                <div class="alert-card">
-                                    <h3 style="margin: 0;">😴 Drowsiness Detected</h3>
-                                    <p style="margin: 0.5rem 0; opacity: 0.9;">Please stay alert!</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                            else:
-                                drowsiness_alert.markdown("""
-                                <div class="safe-card">
-                                    <h3 style="margin: 0;">✅ Alert</h3>
-                                    <p style="margin: 0.5rem 0; opacity: 0.9;">Stay focused!</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                            
-                            if yawning_detected:
-                                yawn_alert.markdown("""
-                                <div class="alert-card">
-                                    <h3 style="margin: 0;">🥱 Yawning Detected</h3>
-                                    <p style="margin: 0.5rem 0; opacity: 0.9;">Take a break if needed!</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                            else:
-                                yawn_alert.markdown("""
-                                <div class="safe-card">
-                                    <h3 style="margin: 0;">✅ Alert</h3>
-                                    <p style="margin: 0.5rem 0; opacity: 0.9;">Stay focused!</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                            
-                            if phone_detected:
-                                phone_alert.markdown("""
-                                <div class="alert-card">
-                                    <h3 style="margin: 0;">📱 Phone Detected</h3>
-                                    <p style="margin: 0.5rem 0; opacity: 0.9;">Focus on driving!</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                            else:
-                                phone_alert.markdown("""
-                                <div class="safe-card">
-                                    <h3 style="margin: 0;">✅ Alert</h3>
-                                    <p style="margin: 0.5rem 0; opacity: 0.9;">Stay focused!</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                            
-                            stframe.image(frame, channels="BGR")
-                    cap.release()
+                # The monitoring session lives in session state across reruns; it is
+                # restarted when the preview settings change and stopped with the camera checkbox
+                options = {
+                    'trip_id': st.session_state.current_trip_id,
+                    'debug_yawn': st.session_state.get('debug_yawn', False),
+                    'preview_fps': preview_fps,
+                    'preview_width': preview_width,
+                    'mjpeg_preview': mjpeg_preview,
+                }
+                if not run or st.session_state.get('monitoring_options') != options:
+                    stop_monitoring()
+                session = st.session_state.get('monitoring_session')
+                if run and session is None:
+                    alert_engine = st.session_state.alert_engine
+                    stream = st.session_state.current_trip_id
+                    alarms = get_alarm_service()
+                    def on_alerts(alerts):
+                        # Runs on the monitoring thread; play() only queues work for the alarm scheduler
+                        for alert_type in alert_engine.update(stream, alerts, time.monotonic()):
+                            alarms.play(alert_type)
+                    # Steps resolution, iris refinement and YOLO cadence to stay inside the deadline;
+                    # with adaptation off it only counts deadline misses at full quality
+                    quality = QualityController(
+                        deadline=MONITOR_FRAME_DEADLINE_MS / 1000.0,
+                        levels=QUALITY_LEVELS if MONITOR_ADAPTIVE_QUALITY else QUALITY_LEVELS[:1]
+                    )
+                    # FaceMesh every 2nd frame, optical flow on the eye/mouth/pose points in between;
+                    # YOLO overlaps with FaceMesh on the monitor's thread pool
+                    session = MonitoringSession(
+                        st.session_state.username,
+                        st.session_state.current_trip_id,
+                        # Queued for the background writer, the monitoring thread never waits on MongoDB
+                        log_ride_async,
+                        camera=0,
+                        pipelined=MONITOR_PIPELINED,
+                        reuse_buffers=MONITOR_REUSE_BUFFERS,
+                        on_alerts=on_alerts,
+                        debug_yawn=options['debug_yawn'],
+                        preview_fps=preview_fps,
+                        preview_width=preview_width,
+                        mjpeg_port=8765 if mjpeg_preview else None,
+                        keyframe_interval=2 if MONITOR_TRACK_LANDMARKS else 1,
+                        crop_roi=MONITOR_CROP_PHONE_ROI,
+                        quality=quality
+                    )
+                    st.session_state.monitoring_session = session.start()
+                    st.session_state.monitoring_options = options
+                
+                session = st.session_state.get('monitoring_session')
+                if session is not None and session.mjpeg is not None:
+                    # The browser pulls the stream itself, bypassing the Streamlit websocket
+                    st.markdown(f'<img src="{session.mjpeg.url}" style="width: 100%;">', unsafe_allow_html=True)
+                
+                @st.fragment(run_every=1.0 / preview_fps)
+                def live_view():
+                    session = st.session_state.get('monitoring_session')
+                    if session is None:
+                        return
+                    snapshot = session.snapshot()
+                    if not snapshot['running']:
+                        # Alerts and preview would be frozen; a full run replaces the session
+                        # and shows why it stopped next to the camera checkbox
+                        st.warning("⚠️ Monitoring is not running")
+                        st.rerun()
+                    if session.mjpeg_error is not None:
+                        st.warning(f"MJPEG preview unavailable: {session.mjpeg_error}")
+                    monitor = session.monitor
+                    if monitor is not None:
+                        quality = monitor.quality
+                        settings = quality.settings
+                        st.caption(
+                            f"⚙️ Quality: {settings['name']} (scale {settings['scale']:.2f}, "
+                            f"iris {'on' if settings['refine_landmarks'] else 'off'}, "
+                            f"YOLO every {settings['phone_interval']} frames) · "
+                            f"{quality.deadline_misses} of {quality.frames} frames missed the "
+                            f"{quality.deadline * 1000:.0f} ms deadline"
+                        )
+                        st.caption(
+                            f"📱 Phone detector ran on {monitor.phone_detector.scheduler.effective_rate:.0%} of frames · "
+                            f"{snapshot['fps']:.1f} fps"
+                        )
+                    writer = get_ride_writer().stats()
+                    if writer['queue_depth'] or writer['dropped'] or writer['spilled']:
+                        st.caption(
+                            f"🗄️ Event writer: {writer['queue_depth']} queued, {writer['dropped']} dropped, "
+                            f"{writer['spilled']} spilled, last flush {writer['last_flush_ms']:.0f} ms"
+                        )
+                    for mouth_ratio, mouth_distance, face_width in snapshot['yawn_debug']:
+                        st.caption(f"Yawn debug: ratio={mouth_ratio:.3f}, dist={mouth_distance:.1f}, width={face_width:.1f}")
+                    if snapshot['jpeg'] is not None and session.mjpeg is None:
+                        st.image(snapshot['jpeg'])
+                
+                live_view()
                 
                 # End Trip Button
                 col1, col2, col3 = st.columns([1, 2, 1])
                 with col2:
                     if st.button('🏁 End Trip', key='end_trip_btn', use_container_width=True):
                         # Mark trip as ended (KEEPING FUNCTIONALITY INTACT)
-                        from pymongo import MongoClient
-                        client = MongoClient("mongodb://localhost:27017/IDP")
-                        db = client["IDP"]
-                        db["trips"].update_one({'_id': ObjectId(st.session_state.current_trip_id)}, {"$set": {"end_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')}})
+                        stop_monitoring()
+                        # The trip's last episodes are only queued; the summary below reads them back
+                        get_ride_writer().flush()
+                        if 'alert_engine' in st.session_state:
+                            st.session_state.alert_engine.remove(st.session_state.current_trip_id)
+                        end_trip(st.session_state.current_trip_id)
                         st.session_state.trip_started = False
                         st.session_state.current_trip_id = None
                         st.success("✅ Trip ended successfully!")
@@ -1224,6 +1223,10 @@ if st.session_state.current_page == 'dashboard':
                         )
         
         elif driver_option == "Download Report":
+            # Monitoring only runs while its page is shown
+            stop_monitoring()
+            # Reports must include the events still queued in the background writer
+            get_ride_writer().flush()
             st.markdown('<div class="section-header">📥 Download Report</div>', unsafe_allow_html=True)
             
             trips = get_trips_for_driver(st.session_state.username)
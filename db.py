@@ -1,6 +1,14 @@
 from pymongo import MongoClient
 from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, PyMongoError
+from bson import ObjectId, json_util
+from collections import deque
+from datetime import datetime
 from typing import Optional, Dict, Any, List
+import atexit
+import os
+import threading
+import time
 
 # Use the provided MongoDB URI
 MONGO_URI = "mongodb://localhost:27017/IDP"
@@ -43,6 +51,187 @@ def get_drivers_for_manager(manager_username: str) -> List[Dict[str, Any]]:
 def log_ride(event: Dict[str, Any]) -> None:
     rides_col.insert_one(event)
 
+def log_rides(events: List[Dict[str, Any]]) -> None:
+    if events:
+        rides_col.insert_many(events)
+
+class RideWriter:
+    """
+    Writes ride events from a background thread so callers never wait on MongoDB.
+    Events go into a bounded queue and are flushed with insert_many(ordered=False)
+    once `batch_size` are waiting or `flush_interval` seconds have passed. While
+    the database is unreachable the batch is retried with backoff.
+
+    When the queue is full, `backpressure` decides: 'block' waits for room,
+    'drop-oldest' discards the oldest queued event, 'spill' appends the event to
+    `spill_path` as JSON lines (re-insert them later with replay_spill).
+    """
+
+    def __init__(self, collection: Collection, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, backpressure: str = 'drop-oldest',
+                 spill_path: str = 'rides_spill.jsonl') -> None:
+        if backpressure not in ('block', 'drop-oldest', 'spill'):
+            raise ValueError(f"unknown backpressure policy: {backpressure}")
+        self.collection = collection
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure
+        self.spill_path = spill_path
+        self.written = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.failed = 0
+        self.retries = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._batch: List[Dict[str, Any]] = []
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, event: Dict[str, Any]) -> None:
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                if self.backpressure == 'block':
+                    self._cond.wait_for(lambda: len(self._queue) < self.max_queue or not self._running)
+                elif self.backpressure == 'drop-oldest':
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    self._spill([event])
+                    return
+            self._queue.append(event)
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _spill(self, events: List[Dict[str, Any]]) -> None:
+        with open(self.spill_path, 'a') as f:
+            for event in events:
+                f.write(json_util.dumps(event) + '\n')
+        self.spilled += len(events)
+
+    def _run(self) -> None:
+        backoff = 0.5
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._queue) >= self.batch_size or not self._running,
+                                    timeout=self.flush_interval)
+                if not self._queue:
+                    if not self._running:
+                        return
+                    continue
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._batch = batch
+                self._in_flight = len(batch)
+                self._cond.notify_all()
+            start = time.perf_counter()
+            try:
+                self.collection.insert_many(batch, ordered=False)
+                self.written += len(batch)
+                backoff = 0.5
+            except BulkWriteError as e:
+                # Unordered: everything but the reported documents was inserted (duplicate
+                # keys here come from a retried batch that had partly gone through)
+                errors = len(e.details.get('writeErrors', []))
+                self.failed += errors
+                self.written += len(batch) - errors
+            except PyMongoError:
+                # Database unreachable: put the batch back in front and retry later
+                self.retries += 1
+                with self._cond:
+                    self._queue.extendleft(reversed(batch))
+                    while len(self._queue) > self.max_queue and self.backpressure == 'drop-oldest':
+                        self._queue.popleft()
+                        self.dropped += 1
+                    self._in_flight = 0
+                    self._batch = []
+                if not self._running:
+                    # Shutting down with the database gone: keep the events on disk
+                    with self._cond:
+                        self._spill(list(self._queue))
+                        self._queue.clear()
+                    return
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 10.0)
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            with self._cond:
+                self._in_flight = 0
+                self._batch = []
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until everything queued so far is written. Returns False on timeout."""
+        with self._cond:
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._queue and not self._in_flight, timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Still stuck in a write: keep what has not been confirmed on disk rather than
+            # lose it with the process. Documents already carry their _id, so replay_spill
+            # skips any the stuck write does get in.
+            with self._cond:
+                self._spill(self._batch + list(self._queue))
+                self._queue.clear()
+                self._batch = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': len(self._queue),
+            'written': self.written,
+            'dropped': self.dropped,
+            'spilled': self.spilled,
+            'failed': self.failed,
+            'retries': self.retries,
+            'last_flush_ms': self.last_flush_ms,
+            'max_flush_ms': self.max_flush_ms,
+        }
+
+def replay_spill(spill_path: str = 'rides_spill.jsonl') -> int:
+    """Insert events spilled by a RideWriter and remove the spill file. Returns the count."""
+    if not os.path.exists(spill_path):
+        return 0
+    with open(spill_path) as f:
+        events = [json_util.loads(line) for line in f if line.strip()]
+    if events:
+        try:
+            rides_col.insert_many(events, ordered=False)
+        except BulkWriteError:
+            # Events that made it in before the spill keep their _id and are skipped
+            pass
+    os.remove(spill_path)
+    return len(events)
+
+_ride_writer: Optional[RideWriter] = None
+_ride_writer_lock = threading.Lock()
+
+def get_ride_writer() -> RideWriter:
+    """The process-wide background writer for the rides collection."""
+    global _ride_writer
+    with _ride_writer_lock:
+        if _ride_writer is None:
+            # Own client with short timeouts, so a dead server fails a batch (and close()
+            # spills) within seconds instead of hanging on the 30 s server selection
+            writer_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000, socketTimeoutMS=5000)
+            _ride_writer = RideWriter(writer_client[DB_NAME]["rides"])
+            atexit.register(_ride_writer.close)
+        return _ride_writer
+
+def log_ride_async(event: Dict[str, Any]) -> None:
+    """Queue a ride event for the background writer; returns without touching the network."""
+    get_ride_writer().write(event)
+
 def get_rides_for_driver(driver_username: str) -> List[Dict[str, Any]]:
     return list(rides_col.find({"driver": driver_username}))
 
@@ -55,4 +244,7 @@ def log_trip(trip: Dict[str, Any]) -> str:
     return str(result.inserted_id)
 
 def get_trips_for_driver(driver_username: str) -> List[Dict[str, Any]]:
-    return list(trips_col.find({"driver": driver_username})) 
\ No newline at end of file
+    return list(trips_col.find({"driver": driver_username}))
+
+def end_trip(trip_id: str) -> None:
+    trips_col.update_one({'_id': ObjectId(trip_id)}, {"$set": {"end_time": datetime.now().strftime('%Y-%m-%d %H:%M:%S')}})
@@ -0,0 +1,303 @@
+"""
+Inference backends for the YOLO phone detector.
+
+"ultralytics" runs the .pt weights through PyTorch. "onnx" and "openvino" run a
+one-time export of the same model and do their own letterbox preprocessing and
+NMS, so neither imports torch. Export once with:
+
+    python -m detector.backends export
+
+quantize_yolo.py builds the INT8 model used by "onnx-int8".
+Cross-check an exported backend against ultralytics with:
+
+    python -m detector.backends check --backend onnx frame1.jpg frame2.jpg ...
+"""
+import argparse
+import ast
+import functools
+import os
+import re
+import threading
+import time
+
+import cv2
+import numpy as np
+
+DEFAULT_WEIGHTS = "models/yolov8n.pt"
+ONNX_PATH = "models/yolov8n.onnx"
+ONNX_INT8_PATH = "models/yolov8n_int8.onnx"  # written by quantize_yolo.py
+OPENVINO_PATH = "models/yolov8n_openvino_model/yolov8n.xml"
+
+# Used when an exported model carries no class-name metadata (e.g. after quantization)
+COCO_CELL_PHONE = 67
+FALLBACK_NAMES = {COCO_CELL_PHONE: 'cell phone'}
+
+
+def letterbox(image, size=640, color=(114, 114, 114)):
+    """
+    Resize keeping aspect ratio and pad to a size x size square, as YOLO expects.
+    Returns (padded image, scale ratio, (pad_left, pad_top)).
+    """
+    h, w = image.shape[:2]
+    ratio = min(size / h, size / w)
+    nh, nw = int(round(h * ratio)), int(round(w * ratio))
+    if (nh, nw) != (h, w):
+        image = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    top, left = (size - nh) // 2, (size - nw) // 2
+    padded = cv2.copyMakeBorder(image, top, size - nh - top, left, size - nw - left,
+                                cv2.BORDER_CONSTANT, value=color)
+    return padded, ratio, (left, top)
+
+
+def nms(boxes, scores, iou_threshold=0.45):
+    """Greedy non-maximum suppression on (N, 4) xyxy boxes. Returns kept indices."""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(output, conf, iou_threshold, ratio, pad, image_shape):
+    """
+    Decode a raw YOLOv8 output (1, 4 + classes, anchors) into a list of
+    (x1, y1, x2, y2, score, class_id) in original image coordinates.
+    """
+    pred = np.squeeze(output, 0).T
+    class_scores = pred[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(pred)), class_ids]
+    mask = scores >= conf
+    if not mask.any():
+        return []
+    pred, scores, class_ids = pred[mask], scores[mask], class_ids[mask]
+    cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / ratio
+    boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / ratio
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image_shape[0])
+    # Class-aware NMS: shift each class into its own coordinate range
+    keep = nms(boxes + class_ids[:, None] * 7680.0, scores, iou_threshold)
+    return [(*boxes[i].tolist(), float(scores[i]), int(class_ids[i])) for i in keep]
+
+
+def _parse_names(text):
+    """Class names from ultralytics export metadata (a dict literal or YAML lines)."""
+    if not text:
+        return {}
+    try:
+        names = ast.literal_eval(text)
+        if isinstance(names, dict):
+            return {int(k): v for k, v in names.items()}
+    except (ValueError, SyntaxError):
+        pass
+    return {int(k): v.strip().strip("'\"") for k, v in re.findall(r"^\s+(\d+):\s*(.+)$", text, re.M)}
+
+
+class UltralyticsBackend:
+    """
+    The original path: ultralytics.YOLO on PyTorch. The predictor keeps per-call
+    state, so calls from different threads are serialized.
+    """
+    name = 'ultralytics'
+
+    def __init__(self, weights=DEFAULT_WEIGHTS):
+        from ultralytics import YOLO
+        self.model = YOLO(weights)
+        self.names = self.model.names
+        self._lock = threading.Lock()
+
+    def detect(self, image, conf=0.5, imgsz=None):
+        kwargs = {'imgsz': imgsz} if imgsz is not None else {}
+        with self._lock:
+            results = self.model.predict(source=image, conf=conf, verbose=False, **kwargs)
+        detections = []
+        for r in results:
+            detections.extend(self._parse(r))
+        return detections
+
+    def detect_batch(self, images, conf=0.5, imgsz=None):
+        """One predict call over a list of images; one detection list per image."""
+        kwargs = {'imgsz': imgsz} if imgsz is not None else {}
+        with self._lock:
+            results = self.model.predict(source=list(images), conf=conf, verbose=False, **kwargs)
+        return [self._parse(r) for r in results]
+
+    @staticmethod
+    def _parse(result):
+        boxes = result.boxes
+        return [(*xyxy, float(score), int(cls))
+                for xyxy, score, cls in zip(boxes.xyxy.tolist(), boxes.conf.tolist(), boxes.cls.tolist())]
+
+
+class _ExportedBackend:
+    """Shared letterbox -> inference -> NMS path for exported models."""
+    name = 'exported'
+    iou_threshold = 0.45
+
+    def __init__(self, imgsz=640, static_size=None, dynamic_batch=False):
+        self.imgsz = imgsz
+        self.static_size = static_size
+        self.dynamic_batch = dynamic_batch
+
+    def _infer(self, blob):
+        raise NotImplementedError
+
+    def detect(self, image, conf=0.5, imgsz=None):
+        # Static-shape exports only accept their own input size
+        size = self.static_size or imgsz or self.imgsz
+        padded, ratio, pad = letterbox(image, size)
+        blob = cv2.dnn.blobFromImage(padded, 1 / 255.0, swapRB=True)
+        return postprocess(self._infer(blob), conf, self.iou_threshold, ratio, pad, image.shape)
+
+    def detect_batch(self, images, conf=0.5, imgsz=None):
+        """One forward pass over all images if the export has a dynamic batch axis."""
+        if not self.dynamic_batch or len(images) == 1:
+            return [self.detect(image, conf, imgsz) for image in images]
+        size = self.static_size or imgsz or self.imgsz
+        letterboxed = [letterbox(image, size) for image in images]
+        blob = cv2.dnn.blobFromImages([padded for padded, _, _ in letterboxed], 1 / 255.0, swapRB=True)
+        output = self._infer(blob)
+        return [
+            postprocess(output[i:i + 1], conf, self.iou_threshold, ratio, pad, image.shape)
+            for i, (image, (_, ratio, pad)) in enumerate(zip(images, letterboxed))
+        ]
+
+
+class OnnxBackend(_ExportedBackend):
+    """ONNX Runtime on the CPU execution provider."""
+    name = 'onnx'
+
+    def __init__(self, path=ONNX_PATH, imgsz=640, threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        static_size = model_input.shape[2] if isinstance(model_input.shape[2], int) else None
+        super().__init__(imgsz, static_size, dynamic_batch=not isinstance(model_input.shape[0], int))
+        self.names = _parse_names(self.session.get_modelmeta().custom_metadata_map.get('names')) or FALLBACK_NAMES
+
+    def _infer(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(_ExportedBackend):
+    """OpenVINO IR compiled for the CPU plugin."""
+    name = 'openvino'
+
+    def __init__(self, path=OPENVINO_PATH, imgsz=640):
+        import openvino as ov
+        core = ov.Core()
+        model = core.read_model(path)
+        shape = model.input(0).get_partial_shape()
+        static_size = shape[2].get_length() if shape[2].is_static else None
+        super().__init__(imgsz, static_size, dynamic_batch=shape[0].is_dynamic)
+        self.compiled = core.compile_model(model, 'CPU')
+        self.output = self.compiled.output(0)
+        metadata = os.path.join(os.path.dirname(path), 'metadata.yaml')
+        self.names = FALLBACK_NAMES
+        if os.path.exists(metadata):
+            with open(metadata) as f:
+                self.names = _parse_names(f.read()) or FALLBACK_NAMES
+
+    def _infer(self, blob):
+        return self.compiled([blob])[self.output]
+
+
+BACKENDS = {
+    'ultralytics': UltralyticsBackend,
+    'onnx': OnnxBackend,
+    'onnx-int8': functools.partial(OnnxBackend, ONNX_INT8_PATH),
+    'openvino': OpenVinoBackend,
+}
+
+
+def load_backend(name, **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown phone detector backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+def export_model(weights=DEFAULT_WEIGHTS, formats=('onnx', 'openvino'), imgsz=640):
+    """
+    One-time export of the YOLO weights; files are written next to the weights.
+    Formats whose toolchain is not installed are skipped. Returns {format: path}.
+    """
+    from ultralytics import YOLO
+    model = YOLO(weights)
+    paths = {}
+    for fmt in formats:
+        try:
+            paths[fmt] = model.export(format=fmt, imgsz=imgsz, dynamic=True)
+        except Exception as e:
+            print(f"Skipping {fmt} export: {e}")
+    return paths
+
+
+def cross_check(images, candidate, reference='ultralytics', conf=0.5, iou_match=0.5):
+    """
+    Run two backends on the same images and compare their cell phone boxes.
+    Returns agreement counts, mean IoU of matched boxes and mean latency per backend.
+    """
+    from detector.tracker import box_iou
+    backends = [load_backend(reference), load_backend(candidate)]
+    latencies = {b.name: [] for b in backends}
+    matched, ref_only, cand_only, ious = 0, 0, 0, []
+    for image in images:
+        phones = []
+        for backend in backends:
+            start = time.perf_counter()
+            detections = backend.detect(image, conf=conf)
+            latencies[backend.name].append(time.perf_counter() - start)
+            phones.append([d[:4] for d in detections if backend.names.get(d[5]) == 'cell phone'])
+        ref_boxes, cand_boxes = phones
+        unmatched = list(cand_boxes)
+        for box in ref_boxes:
+            best = max(unmatched, key=lambda c: box_iou(box, c), default=None)
+            if best is not None and box_iou(box, best) >= iou_match:
+                matched += 1
+                ious.append(box_iou(box, best))
+                unmatched.remove(best)
+            else:
+                ref_only += 1
+        cand_only += len(unmatched)
+    return {
+        'images': len(images),
+        'matched': matched,
+        f'{reference}_only': ref_only,
+        f'{candidate}_only': cand_only,
+        'mean_iou': float(np.mean(ious)) if ious else 0.0,
+        'latency_ms': {name: 1000 * float(np.mean(t[1:] or t)) for name, t in latencies.items()},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or cross-check phone detector backends")
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help="export the YOLO weights to ONNX/OpenVINO")
+    export.add_argument('--weights', default=DEFAULT_WEIGHTS)
+    export.add_argument('--format', action='append', choices=['onnx', 'openvino'])
+    check = sub.add_parser('check', help="compare a backend with ultralytics on images")
+    check.add_argument('--backend', default='onnx', choices=['onnx', 'onnx-int8', 'openvino'])
+    check.add_argument('images', nargs='+')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        for fmt, path in export_model(args.weights, tuple(args.format or ('onnx', 'openvino'))).items():
+            print(f"{fmt}: {path}")
+    else:
+        frames = [cv2.imread(p) for p in args.images]
+        print(cross_check([f for f in frames if f is not None], args.backend))
@@ -0,0 +1,119 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Protocol, runtime_checkable
+
+import numpy as np
+
+
+@runtime_checkable
+class Detector(Protocol):
+    """
+    Common interface for the per-frame detectors.
+    `landmarks` is the list of per-face (478, 2) pixel landmark arrays for the frame.
+    needs_landmarks: False if the detector can start before landmarks are known
+    concurrent: True if the detector is expensive enough to be worth a pool thread
+    """
+    name: str
+    needs_landmarks: bool
+    concurrent: bool
+
+    def process(self, frame, landmarks, ts): ...
+
+    def process_batch(self, frames, landmarks, timestamps): ...
+
+
+class BaseDetector:
+    """Default Detector implementation; subclasses only need process()."""
+    name = 'detector'
+    needs_landmarks = True
+    concurrent = False
+
+    def process(self, frame, landmarks, ts):
+        raise NotImplementedError
+
+    def process_batch(self, frames, landmarks, timestamps):
+        return [self.process(f, l, t) for f, l, t in zip(frames, landmarks, timestamps)]
+
+
+def stack_faces(landmarks):
+    """
+    Flatten per-frame face lists into one (M, 478, 2) array for batched kernels.
+    Returns (stacked array or None if there are no faces, faces per frame).
+    """
+    counts = [len(faces) for faces in landmarks]
+    if not any(counts):
+        return None, counts
+    return np.stack([face for faces in landmarks for face in faces]), counts
+
+
+def split_faces(values, counts):
+    """Inverse of stack_faces for per-face results: one list per frame."""
+    out, start = [], 0
+    for n in counts:
+        out.append(list(values[start:start + n]))
+        start += n
+    return out
+
+
+class DetectorRunner:
+    """
+    Runs a set of detectors on each frame, overlapping the expensive ones.
+    Detectors that do not need landmarks (e.g. YOLO phone detection) are submitted
+    to the thread pool as soon as the frame arrives, so they run alongside the
+    landmark stage (FaceMesh); they receive the previous frame's landmarks for any
+    hints they use. Landmark detectors then run inline, or on the pool if marked
+    concurrent. FaceMesh and YOLO release the GIL in native code, so per-frame wall
+    time approaches the slowest stage rather than the sum of all of them.
+    """
+
+    def __init__(self, detectors, landmark_source=None, max_workers=None):
+        self.detectors = list(detectors)
+        self.landmark_source = landmark_source
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or max(2, len(self.detectors)),
+            thread_name_prefix='detector'
+        )
+        self.timings = {}
+        self.frame_time = 0.0
+        self._last_landmarks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def _timed(self, name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        self.timings[name] = time.perf_counter() - start
+        return result
+
+    def run(self, frame, ts=None):
+        """Returns a dict of detector name -> result, plus 'landmarks'."""
+        ts = time.time() if ts is None else ts
+        start = time.perf_counter()
+        futures = {}
+        for d in self.detectors:
+            if not d.needs_landmarks:
+                futures[d.name] = self.executor.submit(self._timed, d.name, d.process, frame, self._last_landmarks, ts)
+        landmarks = []
+        if self.landmark_source is not None:
+            landmarks = self._timed('landmarks', self.landmark_source, frame)
+        results = {'landmarks': landmarks}
+        for d in self.detectors:
+            if not d.needs_landmarks:
+                continue
+            if d.concurrent:
+                futures[d.name] = self.executor.submit(self._timed, d.name, d.process, frame, landmarks, ts)
+            else:
+                results[d.name] = self._timed(d.name, d.process, frame, landmarks, ts)
+        for name, future in futures.items():
+            results[name] = future.result()
+        self._last_landmarks = landmarks
+        self.frame_time = time.perf_counter() - start
+        return results
@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class _Request:
+    __slots__ = ('image', 'conf', 'imgsz', 'future')
+
+    def __init__(self, image, conf, imgsz):
+        self.image = image
+        self.conf = conf
+        self.imgsz = imgsz
+        self.future = Future()
+
+
+class BatchInferenceServer:
+    """
+    Batches YOLO requests from several streams into one forward pass.
+    Stream threads call detect() as they would on a backend; a server thread
+    collects requests until `max_batch` are waiting or `max_wait` seconds have
+    passed since the first one, runs backend.detect_batch() once per input size,
+    and routes each result back to its caller. The server exposes `names` and
+    `detect`, so it can stand in for the backend anywhere a phone model is used.
+    """
+
+    def __init__(self, backend, max_batch=8, max_wait=0.01):
+        self.backend = backend
+        self.names = backend.names
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self.busy_time = 0.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def submit(self, image, conf=0.5, imgsz=None):
+        """Queue a request; returns a Future with the detection list."""
+        request = _Request(image, conf, imgsz)
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("BatchInferenceServer is closed")
+            self._queue.put(request)
+        return request.future
+
+    def detect(self, image, conf=0.5, imgsz=None):
+        return self.submit(image, conf, imgsz).result()
+
+    def close(self):
+        """Stop serving; requests still queued fail instead of leaving their callers waiting."""
+        with self._lock:
+            self._running = False
+            self._queue.put(None)
+        self._thread.join(timeout=2.0)
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                request.future.set_exception(RuntimeError("BatchInferenceServer closed"))
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._running = False
+                break
+            batch.append(request)
+        return batch
+
+    def _serve(self):
+        while self._running:
+            batch = self._collect()
+            if not batch:
+                continue
+            # One forward pass per (input size, confidence) group
+            groups = {}
+            for request in batch:
+                groups.setdefault((request.imgsz, request.conf), []).append(request)
+            start = time.perf_counter()
+            for (imgsz, conf), requests in groups.items():
+                try:
+                    results = self.backend.detect_batch([r.image for r in requests], conf=conf, imgsz=imgsz)
+                    for request, result in zip(requests, results):
+                        request.future.set_result(result)
+                except Exception as e:
+                    for request in requests:
+                        request.future.set_exception(e)
+                self.batches += 1
+            self.busy_time += time.perf_counter() - start
+            self.requests += len(batch)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'ms_per_request': 1000 * self.busy_time / self.requests if self.requests else 0.0,
+        }
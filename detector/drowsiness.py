@@ -1,4 +1,9 @@
 import numpy as np
+from detector.base import BaseDetector, stack_faces, split_faces
+
+LEFT_EYE = [362, 385, 387, 263, 373, 380]
+RIGHT_EYE = [33, 160, 158, 133, 153, 144]
+BOTH_EYES = np.array([LEFT_EYE, RIGHT_EYE])
 
 def get_ear(eye):
     A = np.linalg.norm(eye[1] - eye[5])
@@ -6,4 +11,33 @@ def get_ear(eye):
     C = np.linalg.norm(eye[0] - eye[3])
     ear = (A + B) / (2.0 * C)
     return ear
-  
\ No newline at end of file
+
+def get_ear_batch(eyes):
+    """
+    Vectorized get_ear for arrays of eyes shaped (..., 6, 2), e.g. (N, 6, 2) or
+    (N, 2, 6, 2) for both eyes of N frames. Returns EARs with the leading shape.
+    """
+    eyes = np.asarray(eyes)
+    A = np.linalg.norm(eyes[..., 1, :] - eyes[..., 5, :], axis=-1)
+    B = np.linalg.norm(eyes[..., 2, :] - eyes[..., 4, :], axis=-1)
+    C = np.linalg.norm(eyes[..., 0, :] - eyes[..., 3, :], axis=-1)
+    return (A + B) / (2.0 * C)
+
+def ear_batch(landmarks):
+    """(N, 478, 2) FaceMesh landmarks -> (N, 2) EAR of the left and right eye."""
+    landmarks = np.asarray(landmarks)
+    return get_ear_batch(landmarks[:, BOTH_EYES])
+
+
+class EarDetector(BaseDetector):
+    """Mean eye aspect ratio of both eyes, one value per face."""
+    name = 'ear'
+
+    def process(self, frame, landmarks, ts):
+        return [(get_ear(lm[LEFT_EYE]) + get_ear(lm[RIGHT_EYE])) / 2.0 for lm in landmarks]
+
+    def process_batch(self, frames, landmarks, timestamps):
+        stacked, counts = stack_faces(landmarks)
+        if stacked is None:
+            return [[] for _ in counts]
+        return split_faces(ear_batch(stacked).mean(axis=1), counts)
@@ -0,0 +1,204 @@
+"""
+Headless multi-camera monitoring engine.
+
+Runs the FaceMesh/EAR/yawn/phone pipeline for several video sources in a pool of
+worker processes and writes ride events through db's background RideWriter:
+
+    python -m detector.engine --source cam0 --source rtsp://10.0.0.5/stream --driver alice
+
+With --streams-per-worker N, each worker runs N streams on threads and their YOLO
+calls go through one BatchInferenceServer, so the GPU/CPU sees a single batched
+forward pass instead of N small ones.
+
+Sources are camera indices (cam0, 0), video files or stream URLs; video files
+stand in for cameras when testing.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing.managers import SyncManager
+
+import cv2
+
+
+def parse_source(source):
+    """'cam0' or '0' -> camera index 0, anything else is a file path or URL."""
+    if source.startswith('cam') and source[3:].isdigit():
+        return int(source[3:])
+    if source.isdigit():
+        return int(source)
+    return source
+
+
+def _ignore_sigint():
+    # Ctrl+C is handled by the parent, which sets the stop event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def run_stream(source, driver, trip_id=None, mirror=False, realtime=False, max_frames=None, dry_run=False,
+               phone_model=None, stop=None):
+    """
+    Monitor one source until it ends (or max_frames, or `stop` is set).
+    Creates a trip for the stream unless trip_id is given. Returns a stats dict.
+    """
+    from detector.episodes import EpisodeTracker
+    from detector.monitor import StreamMonitor, frame_events
+    cap = cv2.VideoCapture(parse_source(source))
+    if not cap.isOpened():
+        # Checked before the trip is created, so a bad source leaves no trip behind
+        return {'source': source, 'error': 'could not open source'}
+    if dry_run:
+        log_ride = lambda event: print(f"[{source}] {event}")
+        trip_id = trip_id or 'dry-run'
+    else:
+        from db import log_ride_async as log_ride, log_trip
+        if trip_id is None:
+            try:
+                trip_id = log_trip({
+                    'driver': driver,
+                    'start_point': str(source),
+                    'destination': 'Headless monitoring',
+                    'start_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                })
+            except Exception:
+                cap.release()
+                raise
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = 0
+    # One ride document per episode rather than per frame
+    episodes = EpisodeTracker(log_ride)
+    start = time.perf_counter()
+    try:
+        with StreamMonitor(phone_model=phone_model) as monitor:
+            while (max_frames is None or frames < max_frames) and not (stop is not None and stop.is_set()):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if mirror:
+                    frame = cv2.flip(frame, 1)
+                episodes.update(frame_events(monitor.analyze(frame), driver, trip_id), time.time())
+                frames += 1
+                if realtime:
+                    # Pace video files at their native frame rate
+                    delay = start + frames / fps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+    finally:
+        cap.release()
+        episodes.close()
+        if not dry_run:
+            from db import end_trip, get_ride_writer
+            get_ride_writer().flush()
+            end_trip(trip_id)
+    elapsed = time.perf_counter() - start
+    return {
+        'source': source,
+        'trip_id': trip_id,
+        'frames': frames,
+        'events': episodes.events_in,
+        'records': episodes.records_out,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def run_worker(sources, driver, max_batch=8, max_wait=0.01, **options):
+    """
+    Worker process entry point: monitor a group of sources. A single source runs
+    on the worker's own thread; several run on threads that share one
+    BatchInferenceServer for phone detection. Returns a list of stats dicts.
+    """
+    if len(sources) == 1:
+        return [run_stream(sources[0], driver, **options)]
+
+    from detector.batching import BatchInferenceServer
+    from detector.models import registry
+    from detector.phone_detector import PHONE_MODEL
+    server = BatchInferenceServer(registry.get(PHONE_MODEL), max_batch=max_batch, max_wait=max_wait)
+    stats = [None] * len(sources)
+
+    def monitor(i, source):
+        try:
+            stats[i] = run_stream(source, driver, phone_model=server, **options)
+        except Exception as e:
+            stats[i] = {'source': source, 'error': repr(e)}
+
+    threads = [threading.Thread(target=monitor, args=(i, source)) for i, source in enumerate(sources)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.close()
+    for result in stats:
+        result['batching'] = server.stats()
+    return stats
+
+
+def run_engine(sources, driver, workers=None, streams_per_worker=1, max_batch=8, max_wait=0.01, **options):
+    """
+    Monitor all sources in a pool of worker processes. Returns per-stream stats.
+    On Ctrl+C every stream is stopped and ends its trip before the pool shuts down.
+    """
+    groups = [sources[i:i + streams_per_worker] for i in range(0, len(sources), streams_per_worker)]
+    workers = workers or min(len(groups), os.cpu_count() or 1)
+    # spawn: every worker gets its own MongoClient, FaceMesh and YOLO instances
+    context = multiprocessing.get_context('spawn')
+    stats = []
+    # Cameras and RTSP streams never end by themselves, so the streams poll a shared stop
+    # event; the manager must survive the Ctrl+C to deliver it
+    manager = SyncManager(ctx=context)
+    manager.start(_ignore_sigint)
+    try:
+        stop = manager.Event()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_ignore_sigint) as pool:
+            futures = {
+                pool.submit(run_worker, group, driver, max_batch=max_batch, max_wait=max_wait, stop=stop,
+                            **options): group
+                for group in groups
+            }
+            try:
+                for future in as_completed(futures):
+                    for result in future.result():
+                        stats.append(result)
+                        print(f"[{result['source']}] finished: {result}")
+            except KeyboardInterrupt:
+                print("Stopping streams...")
+                stop.set()
+                for future in futures:
+                    future.cancel()
+                # Leaving the pool waits for the running streams to close their episodes and trips
+                raise
+    finally:
+        manager.shutdown()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless driver monitoring for several cameras")
+    parser.add_argument('--source', action='append', required=True,
+                        help="camera (cam0, 0), video file or stream URL; repeat for more streams")
+    parser.add_argument('--driver', required=True, help="driver username the events are logged for")
+    parser.add_argument('--trip-id', help="log into an existing trip instead of creating one per stream")
+    parser.add_argument('--workers', type=int,
+                        help="worker processes (default: one per stream group, up to the core count)")
+    parser.add_argument('--streams-per-worker', type=int, default=1,
+                        help="streams per worker process; YOLO calls of a worker's streams are batched")
+    parser.add_argument('--max-batch', type=int, default=8, help="largest YOLO batch across a worker's streams")
+    parser.add_argument('--max-wait-ms', type=float, default=10.0,
+                        help="how long the first request of a batch waits for others to join")
+    parser.add_argument('--mirror', action='store_true', help="mirror frames like the in-app webcam view")
+    parser.add_argument('--realtime', action='store_true', help="pace video files at their native frame rate")
+    parser.add_argument('--max-frames', type=int, help="stop each stream after this many frames")
+    parser.add_argument('--dry-run', action='store_true', help="print events instead of writing to MongoDB")
+    args = parser.parse_args()
+
+    run_engine(
+        args.source, args.driver, workers=args.workers, streams_per_worker=args.streams_per_worker,
+        max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000, trip_id=args.trip_id, mirror=args.mirror,
+        realtime=args.realtime, max_frames=args.max_frames, dry_run=args.dry_run
+    )
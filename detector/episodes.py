@@ -0,0 +1,103 @@
+class Episode:
+    """One ongoing condition (e.g. a nod-off or a phone in view) being accumulated."""
+    __slots__ = ('event', 'onset', 'last_seen', 'end_timestamp', 'frames', 'min_ear', 'max_ear', 'segment')
+
+    def __init__(self, event, ts, segment=0):
+        self.event = event
+        self.onset = ts
+        self.last_seen = ts
+        self.end_timestamp = event['timestamp']
+        self.frames = 0
+        self.min_ear = None
+        self.max_ear = None
+        self.segment = segment
+        self.add(event, ts)
+
+    def add(self, event, ts):
+        self.last_seen = ts
+        self.end_timestamp = event['timestamp']
+        self.frames += 1
+        ear = event.get('ear_value')
+        if ear is not None:
+            self.min_ear = ear if self.min_ear is None else min(self.min_ear, ear)
+            self.max_ear = ear if self.max_ear is None else max(self.max_ear, ear)
+
+    def record(self):
+        """
+        The ride document for this episode: the onset event's fields (so existing
+        reports keep working, with ear_value being the lowest EAR seen) plus the
+        episode's extent.
+        """
+        doc = dict(self.event)
+        doc['end_timestamp'] = self.end_timestamp
+        doc['duration_s'] = round(self.last_seen - self.onset, 2)
+        doc['frames'] = self.frames
+        if self.min_ear is not None:
+            doc['ear_value'] = self.min_ear
+            doc['min_ear'] = self.min_ear
+            doc['max_ear'] = self.max_ear
+        if self.segment:
+            # Continuation of an episode that was checkpointed
+            doc['segment'] = self.segment
+        return doc
+
+
+class EpisodeTracker:
+    """
+    Coalesces per-frame ride events into episodes, one document per episode
+    instead of one per frame. An episode opens on the first frame with an event
+    of its type and closes once no such event has been seen for `gap` seconds;
+    it is then written through `write(doc)`. Episodes longer than
+    `checkpoint_interval` seconds are written in segments of that length, so a
+    crash loses at most one segment.
+
+    Timestamps are passed in by the caller (frame time, or video time offline).
+    """
+
+    def __init__(self, write, gap=0.5, checkpoint_interval=30.0):
+        self.write = write
+        self.gap = gap
+        self.checkpoint_interval = checkpoint_interval
+        self.events_in = 0
+        self.records_out = 0
+        self._open = {}
+
+    def update(self, events, ts):
+        """Feed one frame's events (from frame_events) at time `ts`."""
+        self.events_in += len(events)
+        seen = set()
+        for event in events:
+            key = event['event_type']
+            if key in seen:
+                # Several faces with the same event on one frame count as one frame
+                continue
+            seen.add(key)
+            episode = self._open.get(key)
+            if episode is None:
+                self._open[key] = Episode(event, ts)
+                continue
+            if ts - episode.onset >= self.checkpoint_interval:
+                self._emit(episode)
+                self._open[key] = Episode(event, ts, segment=episode.segment + 1)
+            else:
+                episode.add(event, ts)
+        for key in [k for k, e in self._open.items() if k not in seen and ts - e.last_seen > self.gap]:
+            self._emit(self._open.pop(key))
+
+    def close(self):
+        """Write all open episodes, e.g. when the stream or trip ends."""
+        for episode in self._open.values():
+            self._emit(episode)
+        self._open = {}
+
+    def _emit(self, episode):
+        self.write(episode.record())
+        self.records_out += 1
+
+    def stats(self):
+        return {
+            'events': self.events_in,
+            'records': self.records_out,
+            'open': len(self._open),
+            'reduction': self.events_in / self.records_out if self.records_out else 0.0,
+        }
@@ -0,0 +1,336 @@
+"""
+Shared-memory frame ring for moving frames between processes without pickling.
+
+A capture process writes each frame once into a fixed-shape slot; consumer
+processes (FaceMesh, YOLO, a recorder) attach to the same block and read the
+frames in place.
+
+This is a standalone building block: live monitoring (session, engine) hands
+frames between threads in one process and offline analysis decodes inside each
+worker, so nothing here uses it yet. Benchmark against multiprocessing.Queue:
+
+    python -m detector.frame_ring --frames 600
+
+By default the producer waits for the consumer like the bounded Queue does, so
+both deliver every frame; --lossy lets the writer lap the reader as a live
+camera would and reports the frames dropped next to the throughput.
+"""
+import argparse
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+_ALIGN = 64
+
+
+class SharedFrameRing:
+    """
+    `slots` frames of one shape and dtype in a multiprocessing.shared_memory block.
+
+    Frame n (counting from 0) goes to slot n % slots. Each slot has a sequence word
+    used as a seqlock: the writer sets it to 2n + 1 before copying the frame in and
+    to 2n + 2 afterwards, then publishes n as the latest frame. A reader checks the
+    word before and after touching the slot, so readers never lock and never block
+    the writer; a frame that was overwritten while being read is reported as lost.
+    There is a single writer per ring.
+
+    Create the ring in one process and pass `ring.spec` (picklable) to the others,
+    which call SharedFrameRing.attach(spec).
+    """
+
+    def __init__(self, shape, dtype=np.uint8, slots=8, name=None, create=True):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self._owner = create
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._slot_bytes = -(-frame_bytes // _ALIGN) * _ALIGN
+        # header: [latest frame, closed flag, slot sequence words...], then slot timestamps
+        header_bytes = -(-(8 * (2 + slots) + 8 * slots) // _ALIGN) * _ALIGN
+        size = header_bytes + self._slot_bytes * slots
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self._shm = _attach(name)
+        buf = self._shm.buf
+        self._header = np.ndarray((2 + slots,), dtype=np.int64, buffer=buf)
+        self._seq = self._header[2:]
+        self._timestamps = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=8 * (2 + slots))
+        self._frames = [
+            np.ndarray(self.shape, dtype=self.dtype, buffer=buf, offset=header_bytes + i * self._slot_bytes)
+            for i in range(slots)
+        ]
+        if create:
+            self._header[0] = -1
+            self._header[1] = 0
+            self._seq[:] = 0
+        self._written = int(self._header[0]) + 1
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def spec(self):
+        return {'name': self.name, 'shape': self.shape, 'dtype': self.dtype.str, 'slots': self.slots}
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(spec['shape'], spec['dtype'], spec['slots'], name=spec['name'], create=False)
+
+    def write(self, frame, ts=None):
+        """Copy a frame into the next slot. Returns its sequence number."""
+        n = self._written
+        slot = n % self.slots
+        self._seq[slot] = 2 * n + 1
+        np.copyto(self._frames[slot], frame, casting='no')
+        self._timestamps[slot] = time.time() if ts is None else ts
+        self._seq[slot] = 2 * n + 2
+        self._header[0] = n
+        self._written = n + 1
+        return n
+
+    def write_from(self, source):
+        """
+        Let `source(out)` fill the next slot in place, e.g. a cv2 call with dst=out,
+        so the frame is written exactly once. `source` returns False to abort; the
+        frame that was in the slot is then lost.
+        """
+        n = self._written
+        slot = n % self.slots
+        self._seq[slot] = 2 * n + 1
+        if source(self._frames[slot]) is False:
+            # source may have written part of the slot already; 0 is never a valid sequence
+            self._seq[slot] = 0
+            return None
+        self._timestamps[slot] = time.time()
+        self._seq[slot] = 2 * n + 2
+        self._header[0] = n
+        self._written = n + 1
+        return n
+
+    @property
+    def latest(self):
+        """Sequence number of the newest complete frame, -1 before the first one."""
+        return int(self._header[0])
+
+    @property
+    def closed(self):
+        return bool(self._header[1])
+
+    def mark_closed(self):
+        """Tell readers no more frames are coming."""
+        self._header[1] = 1
+
+    def valid(self, n):
+        """True while frame n is still in its slot (not yet overwritten)."""
+        return n >= 0 and self._seq[n % self.slots] == 2 * n + 2
+
+    def view(self, n):
+        """
+        Zero-copy (frame, timestamp) for frame n, or None if it is not available.
+        The array aliases the slot: call valid(n) after using it to confirm the
+        writer did not lap the reader in the meantime.
+        """
+        if not self.valid(n):
+            return None
+        slot = n % self.slots
+        return self._frames[slot], float(self._timestamps[slot])
+
+    def read(self, n, out=None):
+        """Consistent copy of frame n (into `out` if given), or None if it was overwritten."""
+        slot = n % self.slots
+        if not self.valid(n):
+            return None
+        ts = float(self._timestamps[slot])
+        if out is None:
+            out = self._frames[slot].copy()
+        else:
+            np.copyto(out, self._frames[slot])
+        return (out, ts) if self.valid(n) else None
+
+    def close(self):
+        self._frames = self._header = self._seq = self._timestamps = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _attach(name):
+    try:
+        # Python 3.13+: attaching processes leave the block to its creator
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Older versions register it again with the resource tracker; processes
+        # started by the creator share its tracker, so that is harmless
+        return shared_memory.SharedMemory(name=name)
+
+
+class FrameRingReader:
+    """
+    One consumer's cursor into a SharedFrameRing. With latest=True (FaceMesh, YOLO)
+    next() jumps to the newest frame, skipping any the consumer was too slow for;
+    with latest=False (a recorder) it returns every frame still in the ring in order.
+    Either way `dropped` counts frames the consumer never saw.
+    """
+
+    def __init__(self, ring, latest=True, poll=0.0005):
+        self.ring = ring
+        self.latest = latest
+        self.poll = poll
+        self.dropped = 0
+        self._last = ring.latest if latest else -1
+
+    def next(self, timeout=1.0, copy=False):
+        """
+        Wait for a frame not returned before. Returns (seq, frame, ts), or None on
+        timeout or once the writer has closed the ring and everything was read.
+        The frame is a zero-copy view unless copy=True.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            newest = self.ring.latest
+            if newest > self._last:
+                if self.latest:
+                    n = newest
+                else:
+                    # Oldest frame still in the ring if we fell behind a full lap
+                    n = max(self._last + 1, newest - self.ring.slots + 1)
+                self.dropped += n - self._last - 1
+                self._last = n
+                item = self.ring.read(n) if copy else self.ring.view(n)
+                if item is None:
+                    # Overwritten between the checks
+                    self.dropped += 1
+                    continue
+                return (n, *item)
+            if self.ring.closed or time.perf_counter() >= deadline:
+                return None
+            time.sleep(self.poll)
+
+
+def capture_to_ring(source, spec, mirror=False, max_frames=None):
+    """
+    Capture process entry point: decode `source` straight into the ring's slots.
+    Marks the ring closed when the source ends.
+    """
+    ring = SharedFrameRing.attach(spec)
+    cap = cv2.VideoCapture(source)
+    frames = 0
+    try:
+        while cap.isOpened() and (max_frames is None or frames < max_frames):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if mirror:
+                ring.write_from(lambda out: cv2.flip(frame, 1, dst=out))
+            else:
+                ring.write(frame)
+            frames += 1
+    finally:
+        ring.mark_closed()
+        cap.release()
+        ring.close()
+    return frames
+
+
+def _produce_ring(spec, count, frame_shape, acked=None):
+    ring = SharedFrameRing.attach(spec)
+    frame = np.random.randint(0, 255, frame_shape, dtype=np.uint8)
+    for i in range(count):
+        if acked is not None:
+            # Never overwrite a frame the consumer has not finished with
+            while i - acked.value >= ring.slots:
+                time.sleep(0.0005)
+        frame[0, 0, 0] = i % 256
+        ring.write(frame)
+    ring.mark_closed()
+    ring.close()
+
+
+def _produce_queue(q, count, frame_shape):
+    frame = np.random.randint(0, 255, frame_shape, dtype=np.uint8)
+    for i in range(count):
+        frame[0, 0, 0] = i % 256
+        q.put((frame, time.time()))
+    q.put(None)
+
+
+def _consume(item):
+    # Touch the frame like a detector would, without dominating the timing
+    frame = item[0]
+    return int(frame[::32, ::32, 0].sum())
+
+
+def benchmark(count=600, shape=(480, 640, 3), slots=8, lossy=False):
+    """
+    Frames/s, latency and dropped frames delivered from a producer process through
+    each transport. Unless `lossy`, the ring producer waits for the consumer's
+    acknowledgement before reusing a slot, matching the blocking Queue.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = {}
+
+    q = context.Queue(maxsize=slots)
+    producer = context.Process(target=_produce_queue, args=(q, count, shape))
+    producer.start()
+    received, latency = 0, 0.0
+    start = time.perf_counter()
+    while True:
+        item = q.get()
+        if item is None:
+            break
+        _consume(item)
+        latency += time.time() - item[1]
+        received += 1
+    elapsed = time.perf_counter() - start
+    producer.join()
+    results['queue'] = {'fps': received / elapsed, 'latency_ms': 1000 * latency / max(received, 1), 'dropped': 0}
+
+    with SharedFrameRing(shape, np.uint8, slots) as ring:
+        reader = FrameRingReader(ring, latest=False)
+        # Frames the consumer is done with, written only by this process
+        acked = None if lossy else context.RawValue('q', 0)
+        producer = context.Process(target=_produce_ring, args=(ring.spec, count, shape, acked))
+        producer.start()
+        received, latency = 0, 0.0
+        start = time.perf_counter()
+        while True:
+            item = reader.next(timeout=5.0)
+            if item is None:
+                break
+            n, frame, ts = item
+            _consume((frame,))
+            latency += time.time() - ts
+            received += 1
+            if acked is not None:
+                acked.value = n + 1
+        elapsed = time.perf_counter() - start
+        producer.join()
+        results['shared_memory'] = {
+            'fps': received / elapsed, 'latency_ms': 1000 * latency / max(received, 1), 'dropped': reader.dropped
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared-memory frame ring vs multiprocessing.Queue")
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--slots', type=int, default=8)
+    parser.add_argument('--lossy', action='store_true', help="let the ring writer overwrite unread frames")
+    args = parser.parse_args()
+
+    for name, r in benchmark(args.frames, (args.height, args.width, 3), args.slots, args.lossy).items():
+        print(f"{name:>13}: {r['fps']:8.1f} frames/s, latency {r['latency_ms']:6.2f} ms, dropped {r['dropped']}")
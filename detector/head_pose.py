@@ -0,0 +1,60 @@
+import cv2
+import numpy as np
+from detector.base import BaseDetector
+
+# Generic 3D face model in camera axes (x right, y down, z away from the camera),
+# nose tip at the origin, and the matching FaceMesh landmark indices
+MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0),          # nose tip
+    (0.0, 330.0, 65.0),       # chin
+    (-225.0, -170.0, 135.0),  # eye outer corner, image left
+    (225.0, -170.0, 135.0),   # eye outer corner, image right
+    (-150.0, 150.0, 125.0),   # mouth corner, image left
+    (150.0, 150.0, 125.0),    # mouth corner, image right
+])
+POSE_LANDMARKS = [1, 152, 33, 263, 61, 291]
+
+FACING_ROAD = 'facing_road'
+LOOKING_DOWN = 'looking_down'
+LOOKING_AWAY = 'looking_away'
+
+
+def estimate_head_pose(landmarks, frame_shape):
+    """
+    Head pose from FaceMesh pixel landmarks with cv2.solvePnP.
+    Returns (yaw, pitch, roll) in degrees, or None if the solve fails.
+    Yaw is positive when the head turns towards image left, pitch is positive
+    when the driver looks down.
+    """
+    h, w = frame_shape[:2]
+    camera_matrix = np.array([[w, 0, w / 2.0], [0, w, h / 2.0], [0, 0, 1]], dtype=np.float64)
+    image_points = np.asarray(landmarks, dtype=np.float64)[POSE_LANDMARKS]
+    ok, rvec, _ = cv2.solvePnP(MODEL_POINTS, image_points, camera_matrix, None,
+                               flags=cv2.SOLVEPNP_ITERATIVE)
+    if not ok:
+        return None
+    R, _ = cv2.Rodrigues(rvec)
+    pitch = np.degrees(np.arctan2(R[2, 1], R[2, 2]))
+    yaw = np.degrees(np.arctan2(-R[2, 0], np.hypot(R[2, 1], R[2, 2])))
+    roll = np.degrees(np.arctan2(R[1, 0], R[0, 0]))
+    return yaw, pitch, roll
+
+
+def classify_head_pose(pose, max_yaw=30.0, max_pitch_down=20.0, max_pitch_up=25.0):
+    """'facing_road', 'looking_down' or 'looking_away' for a (yaw, pitch, roll) pose."""
+    if pose is None:
+        return LOOKING_AWAY
+    yaw, pitch, _ = pose
+    if pitch > max_pitch_down:
+        return LOOKING_DOWN
+    if abs(yaw) > max_yaw or pitch < -max_pitch_up:
+        return LOOKING_AWAY
+    return FACING_ROAD
+
+
+class HeadPoseDetector(BaseDetector):
+    """classify_head_pose label, one per face."""
+    name = 'head_pose'
+
+    def process(self, frame, landmarks, ts):
+        return [classify_head_pose(estimate_head_pose(lm, frame.shape)) for lm in landmarks]
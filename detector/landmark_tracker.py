@@ -0,0 +1,129 @@
+import cv2
+import numpy as np
+from detector.buffers import BufferRing, convert_into, fill_landmarks
+from detector.models import registry
+
+LK_PARAMS = dict(
+    winSize=(21, 21),
+    maxLevel=3,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+)
+
+# Pooled FaceMesh instances (with and without iris refinement) in the model registry
+FACE_MESH = 'face_mesh'
+FACE_MESH_LITE = 'face_mesh_lite'
+
+
+def _face_mesh_loader(refine_landmarks):
+    def load():
+        import mediapipe as mp
+        return mp.solutions.face_mesh.FaceMesh(refine_landmarks=refine_landmarks)
+    return load
+
+
+def _warm_up_face_mesh(face_mesh):
+    face_mesh.process(np.zeros((480, 640, 3), dtype=np.uint8))
+
+
+registry.register(FACE_MESH, _face_mesh_loader(True), warmup=_warm_up_face_mesh, pooled=True)
+registry.register(FACE_MESH_LITE, _face_mesh_loader(False), warmup=_warm_up_face_mesh, pooled=True)
+
+
+def landmarks_from_results(results, frame_shape):
+    """Pixel landmark arrays (478x2) for every face in a FaceMesh result."""
+    if not results.multi_face_landmarks:
+        return []
+    h, w = frame_shape[:2]
+    return [np.array([(lm.x * w, lm.y * h) for lm in face_landmarks.landmark])
+            for face_landmarks in results.multi_face_landmarks]
+
+
+class KeyframeLandmarkTracker:
+    """
+    Runs FaceMesh only every `keyframe_interval` frames and tracks the landmarks we
+    actually use (`indices`, e.g. eye and mouth points) with pyramidal Lucas-Kanade
+    optical flow in between. The remaining landmarks follow the median motion of the
+    tracked ones. If any point is lost or its tracking error exceeds `max_error`,
+    the tracker re-anchors by running FaceMesh on that frame.
+    A keyframe_interval of 1 means FaceMesh runs on every frame.
+    With reuse_buffers the RGB/gray conversions and float32 landmark arrays are
+    written into preallocated buffers instead of being allocated every frame; the
+    returned landmarks then stay valid for the next two frames only.
+    """
+
+    def __init__(self, face_mesh, indices, keyframe_interval=2, max_error=20.0, reuse_buffers=False):
+        self.face_mesh = face_mesh
+        self.reuse_buffers = reuse_buffers
+        self._rgb_ring = BufferRing(1)
+        self._gray_ring = BufferRing(2)
+        self._landmark_ring = BufferRing(3)
+        self.indices = np.array(sorted(set(indices)))
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.max_error = max_error
+        self.keyframes = 0
+        self.tracked_frames = 0
+        self.reanchors = 0
+        self._faces = []
+        self._prev_gray = None
+        self._since_keyframe = 0
+
+    def process(self, frame):
+        """Returns a list of landmark arrays, one per face, for a BGR frame."""
+        gray = None
+        faces = None
+        # A change of input resolution (e.g. quality stepping) forces a keyframe
+        same_size = self._prev_gray is not None and self._prev_gray.shape == frame.shape[:2]
+        if self._faces and same_size and self._since_keyframe + 1 < self.keyframe_interval:
+            gray = self._convert(frame, cv2.COLOR_BGR2GRAY)
+            faces = self._track(gray)
+            if faces is None:
+                self.reanchors += 1
+        if faces is None:
+            rgb = self._convert(frame, cv2.COLOR_BGR2RGB)
+            faces = self._landmarks(self.face_mesh.process(rgb), frame.shape)
+            self.keyframes += 1
+            self._since_keyframe = 0
+        else:
+            self.tracked_frames += 1
+            self._since_keyframe += 1
+        if self.keyframe_interval > 1:
+            self._prev_gray = gray if gray is not None else self._convert(frame, cv2.COLOR_BGR2GRAY)
+        self._faces = faces
+        return faces
+
+    def _convert(self, frame, code):
+        if not self.reuse_buffers:
+            return cv2.cvtColor(frame, code)
+        if code == cv2.COLOR_BGR2GRAY:
+            return convert_into(frame, code, self._gray_ring, channels=1)
+        return convert_into(frame, code, self._rgb_ring)
+
+    def _landmarks(self, results, frame_shape):
+        if not self.reuse_buffers:
+            return landmarks_from_results(results, frame_shape)
+        if not results.multi_face_landmarks:
+            return []
+        h, w = frame_shape[:2]
+        face_list = results.multi_face_landmarks
+        block = self._landmark_ring.next((len(face_list), len(face_list[0].landmark), 2), np.float32)
+        return [fill_landmarks(face_landmarks, w, h, block[i]) for i, face_landmarks in enumerate(face_list)]
+
+    def _track(self, gray):
+        n = len(self.indices)
+        old = np.concatenate([face[self.indices] for face in self._faces]).astype(np.float32)
+        new, status, err = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, old.reshape(-1, 1, 2), None, **LK_PARAMS)
+        if new is None or not status.all() or float(err.max()) > self.max_error:
+            return None
+        new = new.reshape(-1, 2)
+        block = None
+        if self.reuse_buffers:
+            block = self._landmark_ring.next((len(self._faces),) + self._faces[0].shape, np.float32)
+        faces = []
+        for k, face in enumerate(self._faces):
+            face_old = old[k * n:(k + 1) * n]
+            face_new = new[k * n:(k + 1) * n]
+            shift = np.median(face_new - face_old, axis=0)
+            moved = np.add(face, shift, out=block[k]) if block is not None else face + shift
+            moved[self.indices] = face_new
+            faces.append(moved)
+        return faces
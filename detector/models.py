@@ -0,0 +1,97 @@
+import threading
+import time
+
+
+class _Entry:
+    def __init__(self, loader, warmup, pooled):
+        self.loader = loader
+        self.warmup = warmup
+        self.pooled = pooled
+        self.lock = threading.Lock()
+        self.instance = None
+        self.idle = []
+        self.error = None
+
+
+class ModelRegistry:
+    """
+    Process-wide home for the heavy models. Nothing is loaded at import time: a model
+    is built on first use, or ahead of time on a background thread with preload(),
+    and warmed up with a dummy frame so the first real call does not pay for it.
+
+    Shared models (get) have one instance per process, used by every Streamlit
+    session. Pooled models (acquire/release) are for stateful objects such as
+    FaceMesh in video mode: each caller leases its own instance, and instances are
+    kept for reuse instead of being rebuilt on every rerun.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self.timings = {}
+
+    def register(self, name, loader, warmup=None, pooled=False):
+        self._entries[name] = _Entry(loader, warmup, pooled)
+
+    def _load(self, name, entry):
+        start = time.perf_counter()
+        instance = entry.loader()
+        loaded = time.perf_counter()
+        if entry.warmup is not None:
+            entry.warmup(instance)
+        self.timings[name] = {
+            'load_s': loaded - start,
+            'warmup_s': time.perf_counter() - loaded,
+        }
+        return instance
+
+    def get(self, name):
+        """The shared instance, loading it now (or waiting for preload) if needed."""
+        entry = self._entries[name]
+        with entry.lock:
+            if entry.instance is None:
+                entry.instance = self._load(name, entry)
+            return entry.instance
+
+    def acquire(self, name):
+        """Lease an instance of a pooled model; give it back with release()."""
+        entry = self._entries[name]
+        with entry.lock:
+            if entry.idle:
+                return entry.idle.pop()
+            return self._load(name, entry)
+
+    def release(self, name, instance):
+        entry = self._entries[name]
+        with entry.lock:
+            entry.idle.append(instance)
+
+    def ready(self, name):
+        entry = self._entries[name]
+        return entry.instance is not None or bool(entry.idle)
+
+    def _preload(self, names):
+        for name in names:
+            entry = self._entries[name]
+            try:
+                if entry.pooled:
+                    if not self.ready(name):
+                        self.release(name, self.acquire(name))
+                else:
+                    self.get(name)
+                entry.error = None
+            except Exception as e:
+                # get()/acquire() will try again and raise in the caller
+                entry.error = e
+
+    def preload(self, *names):
+        """Load and warm up models on a background thread. Returns the thread, or None if all are ready."""
+        pending = [n for n in names if not self.ready(n)]
+        if not pending:
+            return None
+        thread = threading.Thread(target=self._preload, args=(pending,), daemon=True)
+        thread.start()
+        return thread
+
+
+# One registry per process, shared by all sessions
+registry = ModelRegistry()
@@ -0,0 +1,127 @@
+import time
+from datetime import datetime
+
+import cv2
+
+from detector.base import DetectorRunner
+from detector.drowsiness import EarDetector, LEFT_EYE, RIGHT_EYE
+from detector.head_pose import HeadPoseDetector, POSE_LANDMARKS
+from detector.landmark_tracker import KeyframeLandmarkTracker, FACE_MESH, FACE_MESH_LITE
+from detector.models import registry
+from detector.phone_detector import PhoneDetector
+from detector.quality import QualityController, QUALITY_LEVELS
+from detector.yawn import YawnDetector, YAWN_LANDMARKS
+
+EAR_THRESHOLD = 0.20
+TRACKED_LANDMARKS = LEFT_EYE + RIGHT_EYE + YAWN_LANDMARKS + POSE_LANDMARKS
+
+
+class StreamMonitor:
+    """
+    Detection stage for one video stream: FaceMesh keyframes with optical-flow tracking
+    in between, EAR/yawn/head-pose detectors and scheduled, tracked phone detection,
+    all on a DetectorRunner. The quality controller (full quality only by default)
+    scales the input and steps iris refinement and YOLO cadence when it changes level.
+    phone_model replaces the shared YOLO backend, e.g. with a BatchInferenceServer
+    shared by several streams.
+
+    analyze(frame) returns {'faces': [{'ear', 'yawn', 'head_pose'}, ...],
+    'phone': [PhoneTrack, ...], 'scale': float, 'quality_changed': bool}.
+    """
+
+    def __init__(self, keyframe_interval=2, reuse_buffers=True, crop_roi=True, quality=None, phone_model=None):
+        self.quality = quality or QualityController(levels=QUALITY_LEVELS[:1])
+        self._face_meshes = {}
+        # YOLO every 5th frame while the driver looks down/away (or no face is found),
+        # every 30th while facing the road, every frame for 2 s after a hit
+        self.phone_detector = PhoneDetector(crop_roi=crop_roi, idle_interval=5, gated_interval=30,
+                                            hold_seconds=2.0, model=phone_model)
+        self.landmark_tracker = KeyframeLandmarkTracker(
+            self._face_mesh(self.quality.settings['refine_landmarks']),
+            TRACKED_LANDMARKS,
+            keyframe_interval=keyframe_interval,
+            reuse_buffers=reuse_buffers
+        )
+        self.runner = DetectorRunner(
+            [EarDetector(), YawnDetector(), HeadPoseDetector(), self.phone_detector],
+            landmark_source=self.landmark_tracker.process
+        )
+        self._apply_quality(self.quality.settings)
+
+    def _face_mesh(self, refine_landmarks):
+        # FaceMesh instances are leased from the registry pool, not rebuilt per stream
+        name = FACE_MESH if refine_landmarks else FACE_MESH_LITE
+        if name not in self._face_meshes:
+            self._face_meshes[name] = registry.acquire(name)
+        return self._face_meshes[name]
+
+    def _apply_quality(self, settings):
+        self.phone_detector.scheduler.idle_interval = settings['phone_interval']
+        self.phone_detector.scheduler.gated_interval = settings['phone_gated_interval']
+        self.landmark_tracker.face_mesh = self._face_mesh(settings['refine_landmarks'])
+
+    def analyze(self, frame, ts=None):
+        start = time.perf_counter()
+        scale = self.quality.settings['scale']
+        if scale != 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        results = self.runner.run(frame, ts)
+        faces = [
+            {'ear': ear, 'yawn': yawn, 'head_pose': head_pose}
+            for ear, yawn, head_pose in zip(results['ear'], results['yawn'], results['head_pose'])
+        ]
+        quality_changed = self.quality.record(time.perf_counter() - start, self.runner.timings)
+        if quality_changed:
+            self._apply_quality(self.quality.settings)
+        return {'faces': faces, 'phone': results['phone'], 'scale': scale, 'quality_changed': quality_changed}
+
+    def close(self):
+        self.runner.close()
+        for name, face_mesh in self._face_meshes.items():
+            registry.release(name, face_mesh)
+        self._face_meshes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def frame_events(result, driver, trip_id, timestamp=None, debug_yawn=False):
+    """Ride event documents (for db.log_ride) raised by one analyzed frame."""
+    timestamp = timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    events = []
+    for face in result['faces']:
+        if face['ear'] < EAR_THRESHOLD:
+            events.append({
+                'timestamp': timestamp,
+                'event_type': 'Drowsiness',
+                # float() as numpy float32 values cannot be stored by pymongo
+                'ear_value': round(float(face['ear']), 3),
+                'driver': driver,
+                'trip_id': trip_id
+            })
+        is_yawn, mouth_ratio, mouth_distance, face_width = face['yawn']
+        if is_yawn:
+            if debug_yawn:
+                details = f'Mouth ratio: {mouth_ratio:.3f}, dist: {mouth_distance:.1f}, width: {face_width:.1f}'
+            else:
+                details = 'Mouth distance exceeded threshold'
+            events.append({
+                'timestamp': timestamp,
+                'event_type': 'Yawning',
+                'details': details,
+                'driver': driver,
+                'trip_id': trip_id
+            })
+    if result['phone']:
+        events.append({
+            'timestamp': timestamp,
+            'event_type': 'Phone Usage',
+            'details': 'Mobile phone detected in frame',
+            'driver': driver,
+            'trip_id': trip_id
+        })
+    return events
@@ -0,0 +1,228 @@
+"""
+Offline analysis of recorded dashcam videos.
+
+Runs the same FaceMesh/EAR/yawn/phone pipeline as live monitoring, faster than
+real time: each video is split into keyframe-aligned chunks that are analyzed in
+parallel by a pool of worker processes, and the merged events are written in
+bulk to `rides` under the video's trip:
+
+    python -m detector.offline incident_0412.mp4 --driver alice --start-time "2024-04-12 08:15:00"
+
+Chunk boundaries come from ffprobe when it is installed; without it chunks are
+cut at fixed frame positions and OpenCV seeks to the nearest keyframe itself.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import cv2
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def video_info(path):
+    """(frame count, fps) as reported by the container."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"could not open {path}")
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    return frames, fps
+
+
+def keyframe_indices(path, fps):
+    """Frame indices of the video's keyframes via ffprobe, or None if it is not available."""
+    if shutil.which('ffprobe') is None:
+        return None
+    cmd = [
+        'ffprobe', '-v', 'error', '-select_streams', 'v:0', '-skip_frame', 'nokey',
+        '-show_entries', 'frame=pts_time', '-of', 'csv=p=0', path
+    ]
+    try:
+        output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return sorted({round(float(t) * fps) for t in output.split() if t.strip() not in ('', 'N/A')})
+
+
+def plan_chunks(frame_count, chunk_frames, keyframes=None):
+    """
+    Split [0, frame_count) into (start, end) ranges of about `chunk_frames` frames.
+    With keyframes, every chunk starts on the first keyframe at or after its target
+    position, so a worker can seek there without decoding from an earlier keyframe.
+    """
+    starts = [0]
+    for target in range(chunk_frames, frame_count, chunk_frames):
+        if keyframes is not None:
+            target = next((k for k in keyframes if k >= target), None)
+            if target is None or target >= frame_count:
+                break
+        if target > starts[-1]:
+            starts.append(target)
+    # The last chunk reads to the end of the file, the frame count can be off
+    return list(zip(starts, starts[1:] + [None]))
+
+
+def analyze_chunk(path, start, end, fps, driver, trip_id, start_time, keyframe_interval=2):
+    """
+    Worker process entry point: analyze frames [start, end) of one video.
+    Frames are timestamped with their video time, so the phone scheduler's hold
+    window, the tracker and episode durations behave as they would live. Returns a
+    dict with the chunk's episode records, its frame count, CPU time and the wall
+    clock times it started and finished.
+    """
+    # Ctrl+C is handled by the parent, which cancels the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from detector.episodes import EpisodeTracker
+    from detector.monitor import StreamMonitor, frame_events
+
+    started = time.time()
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    cpu_start = time.process_time()
+    index = start
+    events = []
+    # Episodes are coalesced per chunk; one crossing a chunk boundary is split there
+    episodes = EpisodeTracker(events.append)
+    try:
+        with StreamMonitor(keyframe_interval=keyframe_interval) as monitor:
+            while end is None or index < end:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                ts = index / fps
+                result = monitor.analyze(frame, ts)
+                timestamp = (start_time + timedelta(seconds=ts)).strftime(TIME_FORMAT)
+                episodes.update(frame_events(result, driver, trip_id, timestamp), ts)
+                index += 1
+    finally:
+        cap.release()
+    episodes.close()
+    return {
+        'path': path,
+        'start': start,
+        'frames': index - start,
+        'cpu_s': time.process_time() - cpu_start,
+        'started': started,
+        'finished': time.time(),
+        'events': events,
+    }
+
+
+def analyze_videos(paths, driver, trip_id=None, start_times=None, workers=None, chunk_seconds=60.0,
+                   keyframe_interval=2, dry_run=False):
+    """
+    Analyze video files across a pool of worker processes and write their events.
+    Each video gets its own trip unless trip_id is given. `start_times` maps a path
+    to the datetime the recording started (default: file modification time minus
+    the video's duration). Returns per-video stats including throughput; a video's
+    realtime factor is measured over the span from its first chunk starting to its
+    last chunk finishing, which overlaps other videos' chunks in the pool.
+    """
+    workers = workers or os.cpu_count() or 1
+    start_times = start_times or {}
+    videos = {}
+    jobs = []
+    for path in paths:
+        frame_count, fps = video_info(path)
+        duration = frame_count / fps
+        start_time = start_times.get(path)
+        if start_time is None:
+            # A recording is closed when it ends
+            start_time = datetime.fromtimestamp(os.path.getmtime(path)) - timedelta(seconds=duration)
+        video_trip = trip_id
+        if video_trip is None:
+            video_trip = 'dry-run' if dry_run else _create_trip(path, driver, start_time, duration)
+        chunks = plan_chunks(frame_count, max(1, int(chunk_seconds * fps)), keyframe_indices(path, fps))
+        videos[path] = {'trip_id': video_trip, 'fps': fps, 'chunks': []}
+        jobs.extend((path, start, end, fps, driver, video_trip, start_time, keyframe_interval)
+                    for start, end in chunks)
+
+    # spawn: every worker gets its own FaceMesh and YOLO instances
+    context = multiprocessing.get_context('spawn')
+    wall_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(analyze_chunk, *job) for job in jobs]
+        try:
+            for future in as_completed(futures):
+                chunk = future.result()
+                videos[chunk['path']]['chunks'].append(chunk)
+        except KeyboardInterrupt:
+            for future in futures:
+                future.cancel()
+            raise
+    wall = time.perf_counter() - wall_start
+
+    if not dry_run:
+        from db import log_rides
+    stats = []
+    for path, video in videos.items():
+        chunks = sorted(video['chunks'], key=lambda c: c['start'])
+        # Episodes are written when they close (and open ones in no particular order at the
+        # end of a chunk), so order them by onset; the timestamp format sorts as text
+        events = sorted((event for chunk in chunks for event in chunk['events']), key=lambda e: e['timestamp'])
+        if dry_run:
+            for event in events:
+                print(f"[{path}] {event}")
+        else:
+            log_rides(events)
+        frames = sum(c['frames'] for c in chunks)
+        cpu = sum(c['cpu_s'] for c in chunks)
+        elapsed = max(c['finished'] for c in chunks) - min(c['started'] for c in chunks) if chunks else 0.0
+        stats.append({
+            'path': path,
+            'trip_id': video['trip_id'],
+            'chunks': len(chunks),
+            'frames': frames,
+            'events': len(events),
+            'elapsed_s': round(elapsed, 2),
+            'realtime_factor': frames / video['fps'] / elapsed if elapsed > 0 else 0.0,
+            'fps_per_core': frames / cpu if cpu > 0 else 0.0,
+        })
+    total = sum(s['frames'] for s in stats)
+    print(f"{total} frames in {wall:.1f} s on {workers} workers: "
+          f"{total / wall:.1f} frames/s, {total / wall / workers:.1f} frames/s per worker")
+    return stats
+
+
+def _create_trip(path, driver, start_time, duration):
+    from db import log_trip
+    return log_trip({
+        'driver': driver,
+        'start_point': os.path.basename(path),
+        'destination': 'Offline analysis',
+        'start_time': start_time.strftime(TIME_FORMAT),
+        'end_time': (start_time + timedelta(seconds=duration)).strftime(TIME_FORMAT),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze recorded dashcam videos faster than real time")
+    parser.add_argument('videos', nargs='+', help="video files to analyze")
+    parser.add_argument('--driver', required=True, help="driver username the events are logged for")
+    parser.add_argument('--trip-id', help="log into an existing trip instead of creating one per video")
+    parser.add_argument('--start-time', help=f"recording start ({TIME_FORMAT}), applied to every video; "
+                                             "default: file modification time minus duration")
+    parser.add_argument('--workers', type=int, help="worker processes (default: core count)")
+    parser.add_argument('--chunk-seconds', type=float, default=60.0, help="target chunk length")
+    parser.add_argument('--keyframe-interval', type=int, default=2,
+                        help="run FaceMesh every N frames and track landmarks in between (1: every frame)")
+    parser.add_argument('--dry-run', action='store_true', help="print events instead of writing to MongoDB")
+    args = parser.parse_args()
+
+    start_times = None
+    if args.start_time:
+        start_time = datetime.strptime(args.start_time, TIME_FORMAT)
+        start_times = {path: start_time for path in args.videos}
+    for result in analyze_videos(
+        args.videos, args.driver, trip_id=args.trip_id, start_times=start_times, workers=args.workers,
+        chunk_seconds=args.chunk_seconds, keyframe_interval=args.keyframe_interval, dry_run=args.dry_run
+    ):
+        print(f"[{result['path']}] {result}")
@@ -1,11 +1,116 @@
-from ultralytics import YOLO
+import os
 
-model = YOLO("models/yolov8n.pt")  # Use a fine-tuned version if possible
+import numpy as np
+from detector.backends import load_backend
+from detector.base import BaseDetector
+from detector.models import registry
+from detector.head_pose import estimate_head_pose, classify_head_pose, FACING_ROAD
+from detector.scheduler import AdaptiveScheduler
+from detector.tracker import PhoneTracker
 
-def detect_phone(frame):
-    results = model.predict(source=frame, conf=0.5, verbose=False)
-    for r in results:
-        for i in range(len(r.boxes.cls)):
-            if r.names[int(r.boxes.cls[i])] == 'cell phone':
-                return True
-    return False
+# Inference backend: "ultralytics" (PyTorch), "onnx", "onnx-int8" or "openvino" (see detector/backends.py)
+BACKEND = os.environ.get("PHONE_DETECTOR_BACKEND", "ultralytics")
+
+PHONE_MODEL = 'phone'
+
+# Loaded lazily through the shared registry; use a fine-tuned version if possible
+registry.register(
+    PHONE_MODEL,
+    lambda: load_backend(BACKEND),
+    warmup=lambda model: model.detect(np.zeros((480, 640, 3), dtype=np.uint8))
+)
+
+# YOLO input size used for driver-region crops (full frames use the model default)
+ROI_IMGSZ = 320
+
+
+def face_roi(landmarks, frame_shape, pad_side=1.0, pad_top=0.3, pad_bottom=2.0):
+    """
+    Padded region of interest around the face bounding box, in frame pixels.
+    Extends sideways past the ears and down towards the lap, where phones appear.
+    Padding is expressed in multiples of the face width/height.
+    Returns (x1, y1, x2, y2) or None if the region is empty.
+    """
+    h, w = frame_shape[:2]
+    fx1, fy1 = np.min(landmarks, axis=0)
+    fx2, fy2 = np.max(landmarks, axis=0)
+    face_w, face_h = fx2 - fx1, fy2 - fy1
+    x1 = int(max(0, fx1 - pad_side * face_w))
+    x2 = int(min(w, fx2 + pad_side * face_w))
+    y1 = int(max(0, fy1 - pad_top * face_h))
+    y2 = int(min(h, fy2 + pad_bottom * face_h))
+    if x2 - x1 < 2 or y2 - y1 < 2:
+        return None
+    return x1, y1, x2, y2
+
+
+def detect_phone_boxes(frame, roi=None, imgsz=None, conf=0.5, model=None):
+    """
+    Cell phone detections as a list of (x1, y1, x2, y2, confidence) in frame coordinates.
+    If roi is given, YOLO only sees that crop (at `imgsz`, ROI_IMGSZ by default)
+    and boxes are shifted back into the full frame. `model` defaults to the shared
+    registry backend; a BatchInferenceServer can be passed instead.
+    """
+    ox, oy = 0, 0
+    if roi is not None:
+        x1, y1, x2, y2 = roi
+        frame = frame[y1:y2, x1:x2]
+        ox, oy = x1, y1
+        if imgsz is None:
+            imgsz = ROI_IMGSZ
+    model = model or registry.get(PHONE_MODEL)
+    boxes = []
+    for bx1, by1, bx2, by2, score, cls in model.detect(frame, conf=conf, imgsz=imgsz):
+        if model.names.get(cls) == 'cell phone':
+            boxes.append((bx1 + ox, by1 + oy, bx2 + ox, by2 + oy, score))
+    return boxes
+
+
+def detect_phone(frame, roi=None, imgsz=None, tracker=None, ts=None, model=None):
+    """
+    Phone detections for a frame. With a PhoneTracker the detections update it and the
+    live PhoneTrack list is returned; otherwise the raw boxes are returned.
+    Either way the result is empty (falsy) when no phone is present.
+    """
+    boxes = detect_phone_boxes(frame, roi=roi, imgsz=imgsz, model=model)
+    if tracker is not None:
+        return tracker.update(frame, boxes, ts=ts)
+    return boxes
+
+
+class PhoneDetector(BaseDetector):
+    """
+    Scheduled, tracked phone detection as a Detector returning live PhoneTracks.
+    YOLO runs every `idle_interval` frames while the driver looks down/away (or no face
+    is found), every `gated_interval` frames while facing the road, and on every frame
+    for `hold_seconds` after a hit. With crop_roi, YOLO only sees the face_roi crop.
+    Landmarks are only used as hints, so this detector can run alongside FaceMesh.
+    """
+    name = 'phone'
+    needs_landmarks = False
+    concurrent = True
+
+    def __init__(self, crop_roi=True, idle_interval=5, gated_interval=30, hold_seconds=2.0, model=None):
+        self.crop_roi = crop_roi
+        self.model = model
+        self.tracker = PhoneTracker()
+        self.scheduler = AdaptiveScheduler(
+            self._detect, idle_interval=idle_interval, hold_seconds=hold_seconds,
+            gated_interval=gated_interval, skip=self._follow
+        )
+
+    def _detect(self, frame, roi=None, frame_ts=None):
+        return detect_phone(frame, roi=roi, tracker=self.tracker, ts=frame_ts, model=self.model)
+
+    def _follow(self, frame, roi=None, frame_ts=None):
+        return self.tracker.update(frame, ts=frame_ts)
+
+    def process(self, frame, landmarks, ts):
+        roi = None
+        facing_road = False
+        if landmarks:
+            facing_road = classify_head_pose(estimate_head_pose(landmarks[0], frame.shape)) == FACING_ROAD
+            if self.crop_roi:
+                roi = face_roi(landmarks[0], frame.shape)
+        # Without a face the phone detector falls back to the full frame
+        return self.scheduler(frame, ts, roi=roi, frame_ts=ts, gated=facing_road)
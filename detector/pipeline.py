@@ -0,0 +1,170 @@
+import queue
+import threading
+import time
+
+
+class LatestFrameCapture:
+    """
+    Reads frames from a cv2.VideoCapture on a background thread and keeps only
+    the newest one. A slow consumer always gets the most recent frame instead
+    of working through frames that piled up in the OpenCV buffer.
+
+    `transform` (e.g. a mirror into a BufferRing) is applied in read(), to the
+    frame the consumer actually takes, so frames dropped as stale never use a
+    buffer and never overwrite one still in flight.
+    """
+
+    def __init__(self, cap, transform=None):
+        self.cap = cap
+        self.transform = transform
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self._cond = threading.Condition()
+        self._frame = None
+        self._timestamp = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            # Wait out the current cap.read() so the capture can be released safely
+            self._thread.join()
+
+    def _run(self):
+        while self._running:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            timestamp = time.time()
+            with self._cond:
+                if self._frame is not None:
+                    # Previous frame was never picked up, overwrite it
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._timestamp = timestamp
+                self.frames_read += 1
+                self._cond.notify_all()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        Wait for a frame that has not been returned before.
+        Returns (ok, frame, timestamp); ok is False once capture has stopped.
+        """
+        with self._cond:
+            while self._frame is None:
+                if not self._running:
+                    return False, None, None
+                self._cond.wait(timeout)
+            frame, timestamp = self._frame, self._timestamp
+            self._frame = None
+        if self.transform is not None:
+            frame = self.transform(frame)
+        return True, frame, timestamp
+
+
+class FramePipeline:
+    """
+    Three-stage monitoring pipeline: a capture thread (LatestFrameCapture), a
+    detector thread running `process(frame)`, and the caller's render/log stage
+    which iterates over (frame, result) pairs. The stages are joined by bounded
+    queues that drop the oldest entry when full, so glass-to-alert latency stays
+    around one inference time no matter how slow rendering is.
+
+    Usage:
+        with FramePipeline(cap, process) as pipeline:
+            for frame, result in pipeline:
+                ...
+    """
+
+    _STOP = object()
+
+    def __init__(self, cap, process, transform=None, maxsize=2):
+        self.capture = LatestFrameCapture(cap, transform=transform)
+        self.process = process
+        self.results_dropped = 0
+        self.frames_processed = 0
+        self.last_latency = 0.0
+        self.error = None
+        self._results = queue.Queue(maxsize=maxsize)
+        self._running = False
+        self._thread = None
+        self._started_at = None
+
+    def start(self):
+        self._running = True
+        self._started_at = time.time()
+        self.capture.start()
+        self._thread = threading.Thread(target=self._detect_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self.capture.stop()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            # No timeout: models used by process() may only be released once it has returned
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _put(self, item):
+        while True:
+            try:
+                self._results.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._results.get_nowait()
+                    self.results_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _detect_loop(self):
+        try:
+            while self._running:
+                ok, frame, timestamp = self.capture.read()
+                if not ok:
+                    break
+                result = self.process(frame)
+                self.frames_processed += 1
+                self._put((frame, result, timestamp))
+        except Exception as e:
+            self.error = e
+        finally:
+            self._put(self._STOP)
+
+    def __iter__(self):
+        while True:
+            item = self._results.get()
+            if item is self._STOP:
+                if self.error is not None:
+                    raise self.error
+                return
+            frame, result, timestamp = item
+            self.last_latency = time.time() - timestamp
+            yield frame, result
+
+    @property
+    def fps(self):
+        """Effective detection rate since start()."""
+        if not self._started_at:
+            return 0.0
+        elapsed = time.time() - self._started_at
+        return self.frames_processed / elapsed if elapsed > 0 else 0.0
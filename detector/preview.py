@@ -0,0 +1,120 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+
+class PreviewEncoder:
+    """
+    Throttled JPEG preview of a frame stream. due() says whether the next frame
+    should be shown at `fps`; encode() downsizes it to at most `max_width` pixels
+    wide and stores it as JPEG at `quality`. Frames in between are never copied or
+    encoded, so the preview costs a fixed budget whatever the detection rate.
+    """
+
+    def __init__(self, fps=10.0, max_width=640, quality=70):
+        self.fps = fps
+        self.max_width = max_width
+        self.quality = quality
+        self.frames = 0
+        self.encode_time = 0.0
+        self._cond = threading.Condition()
+        self._jpeg = None
+        self._seq = 0
+        self._next_at = 0.0
+
+    def due(self, now=None):
+        now = time.perf_counter() if now is None else now
+        return now >= self._next_at
+
+    def encode(self, frame, now=None):
+        """JPEG-encode a frame as the latest preview. Returns its sequence number."""
+        start = time.perf_counter()
+        now = start if now is None else now
+        # Keep the cadence even if a frame arrives a little late
+        self._next_at = max(self._next_at + 1.0 / self.fps, now) if self.fps else now
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, round(h * self.max_width / w)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return self._seq
+        self.encode_time += time.perf_counter() - start
+        self.frames += 1
+        with self._cond:
+            self._jpeg = buf.tobytes()
+            self._seq += 1
+            self._cond.notify_all()
+            return self._seq
+
+    def latest(self):
+        """(sequence number, JPEG bytes) of the newest preview; bytes are None before the first."""
+        with self._cond:
+            return self._seq, self._jpeg
+
+    def wait(self, after, timeout=1.0):
+        """Block until a preview newer than `after` exists. Returns latest()."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after, timeout)
+            return self._seq, self._jpeg
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'ms_per_frame': 1000 * self.encode_time / self.frames if self.frames else 0.0,
+        }
+
+
+class MjpegServer:
+    """
+    Serves a PreviewEncoder as an MJPEG stream (multipart/x-mixed-replace) on
+    http://host:port/, so a browser <img> can show the live view without going
+    through the Streamlit websocket. Binds to localhost by default.
+    """
+
+    def __init__(self, preview, host='127.0.0.1', port=8765):
+        self.preview = preview
+        encoder = preview
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                seq = 0
+                try:
+                    while not self.server.stopping:
+                        seq, jpeg = encoder.wait(seq)
+                        if jpeg is None:
+                            continue
+                        self.wfile.write(b'--frame\r\nContent-Type: image/jpeg\r\n')
+                        self.wfile.write(f'Content-Length: {len(jpeg)}\r\n\r\n'.encode())
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b'\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._server.stopping = False
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.stopping = True
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,78 @@
+from collections import deque
+
+import numpy as np
+
+# Quality ladder, best first. scale applies to the frame given to FaceMesh and YOLO,
+# phone_interval/phone_gated_interval are the AdaptiveScheduler cadences.
+QUALITY_LEVELS = [
+    {'name': 'full', 'scale': 1.0, 'refine_landmarks': True, 'phone_interval': 5, 'phone_gated_interval': 30},
+    {'name': 'no-iris', 'scale': 1.0, 'refine_landmarks': False, 'phone_interval': 5, 'phone_gated_interval': 30},
+    {'name': 'reduced', 'scale': 0.75, 'refine_landmarks': False, 'phone_interval': 10, 'phone_gated_interval': 60},
+    {'name': 'low', 'scale': 0.5, 'refine_landmarks': False, 'phone_interval': 15, 'phone_gated_interval': 90},
+]
+
+
+class QualityController:
+    """
+    Keeps the monitoring loop inside a per-frame latency budget by stepping through
+    QUALITY_LEVELS. After each window of `window` frames it compares the 90th
+    percentile frame time with `deadline` (seconds): above it, quality steps down
+    one level; below `headroom * deadline` for `up_windows` windows in a row, it
+    steps back up. Deadline misses and per-stage timings are kept for reporting.
+    """
+
+    def __init__(self, deadline=1 / 15.0, levels=None, level=0, window=30, headroom=0.6, up_windows=3):
+        self.deadline = deadline
+        self.levels = levels or QUALITY_LEVELS
+        self.level = level
+        self.window = window
+        self.headroom = headroom
+        self.up_windows = up_windows
+        self.frames = 0
+        self.deadline_misses = 0
+        self.changes = 0
+        self.stage_times = {}
+        self._times = deque(maxlen=window)
+        self._good_windows = 0
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def record(self, frame_time, stage_times=None):
+        """Record one frame's latency. Returns True if the quality level changed."""
+        self.frames += 1
+        if frame_time > self.deadline:
+            self.deadline_misses += 1
+        if stage_times:
+            self.stage_times = dict(stage_times)
+        self._times.append(frame_time)
+        if len(self._times) < self.window:
+            return False
+        p90 = float(np.percentile(self._times, 90))
+        self._times.clear()
+        if p90 > self.deadline and self.level < len(self.levels) - 1:
+            self.level += 1
+        elif p90 < self.headroom * self.deadline and self.level > 0:
+            self._good_windows += 1
+            if self._good_windows < self.up_windows:
+                return False
+            self.level -= 1
+        else:
+            self._good_windows = 0
+            return False
+        self._good_windows = 0
+        self.changes += 1
+        return True
+
+    def stats(self):
+        return {
+            'level': self.level,
+            'settings': self.settings,
+            'deadline_ms': self.deadline * 1000,
+            'frames': self.frames,
+            'deadline_misses': self.deadline_misses,
+            'miss_rate': self.deadline_misses / self.frames if self.frames else 0.0,
+            'changes': self.changes,
+            'stage_ms': {k: v * 1000 for k, v in self.stage_times.items()},
+        }
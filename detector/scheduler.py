@@ -0,0 +1,82 @@
+import time
+
+
+class AdaptiveScheduler:
+    """
+    Runs an expensive per-frame detector (e.g. detect_phone) at an adaptive cadence.
+    While nothing is detected it runs every `idle_interval` frames; after a hit it
+    runs on every frame for `hold_seconds`. Skipped frames get the cached verdict,
+    or the result of `skip(frame, ...)` if given (e.g. a tracker update).
+
+    A cheaper upstream stage can gate the detector: calls made with gated=True
+    (e.g. the driver is facing the road) use `gated_interval` instead of
+    `idle_interval`, or never run if it is None. A hold window overrides the gate.
+    """
+
+    def __init__(self, detect, idle_interval=5, hold_seconds=2.0, skip=None, gated_interval=None):
+        self.detect = detect
+        self.skip = skip
+        self.gated_interval = gated_interval
+        self.gated_frames = 0
+        self.idle_interval = max(1, int(idle_interval))
+        self.hold_seconds = hold_seconds
+        self.frames = 0
+        self.runs = 0
+        self.last_result = False
+        self._since_run = None
+        self._hold_until = 0.0
+        self._started_at = None
+        self._now = 0.0
+        self._gated = False
+
+    @property
+    def interval(self):
+        """Current cadence in frames (1 while holding after a detection, None if gated off)."""
+        if self._now < self._hold_until:
+            return 1
+        if self._gated:
+            return self.gated_interval
+        return self.idle_interval
+
+    def should_run(self, ts=None, gated=False):
+        self._now = time.time() if ts is None else ts
+        self._gated = gated
+        interval = self.interval
+        if interval is None:
+            return False
+        return self._since_run is None or self._since_run + 1 >= interval
+
+    def __call__(self, frame, ts=None, *args, gated=False, **kwargs):
+        run = self.should_run(ts, gated)
+        if self._started_at is None:
+            self._started_at = self._now
+        self.frames += 1
+        if self._gated and self._now >= self._hold_until:
+            self.gated_frames += 1
+        if run:
+            self.last_result = self.detect(frame, *args, **kwargs)
+            self.runs += 1
+            self._since_run = 0
+            if self.last_result:
+                self._hold_until = self._now + self.hold_seconds
+        else:
+            self._since_run = (self._since_run or 0) + 1
+            if self.skip is not None:
+                self.last_result = self.skip(frame, *args, **kwargs)
+        return self.last_result
+
+    @property
+    def effective_rate(self):
+        """Fraction of frames on which the detector actually ran."""
+        return self.runs / self.frames if self.frames else 0.0
+
+    def stats(self):
+        elapsed = (self._now - self._started_at) if self._started_at is not None else 0.0
+        return {
+            'frames': self.frames,
+            'runs': self.runs,
+            'effective_rate': self.effective_rate,
+            'runs_per_second': self.runs / elapsed if elapsed > 0 else 0.0,
+            'gated_frames': self.gated_frames,
+            'interval': self.interval,
+        }
@@ -0,0 +1,196 @@
+import threading
+import time
+
+import cv2
+
+from detector.buffers import BufferRing, flip_into
+from detector.episodes import EpisodeTracker
+from detector.monitor import StreamMonitor, frame_events
+from detector.pipeline import FramePipeline
+from detector.preview import MjpegServer, PreviewEncoder
+
+ALERT_TYPES = ('drowsiness', 'yawning', 'phone')
+_EVENT_ALERTS = {'Drowsiness': 'drowsiness', 'Yawning': 'yawning', 'Phone Usage': 'phone'}
+
+
+def draw_overlays(frame, result, alerts):
+    """Alert captions and phone boxes on the displayed frame."""
+    if alerts['drowsiness']:
+        cv2.putText(frame, "DROWSINESS ALERT", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 3)
+    if alerts['yawning']:
+        cv2.putText(frame, "YAWNING", (20, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 0, 0), 3)
+    if alerts['phone']:
+        for track in result['phone']:
+            # Boxes come from the (possibly downscaled) detection frame
+            x1, y1, x2, y2 = (int(v / result['scale']) for v in track.box)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
+        cv2.putText(frame, "MOBILE PHONE DETECTED", (20, 120), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 255), 3)
+    return frame
+
+
+class MonitoringSession:
+    """
+    One driver's camera monitoring on a background thread, so the Streamlit script
+    run is never blocked by the capture loop.
+
+    The worker captures, analyzes and calls `on_alerts(alerts)` for every frame,
+    logs events through `log_event` as one document per episode (EpisodeTracker),
+    then publishes the alert state; the page reads the latest state with
+    snapshot() from a periodic fragment. Detection runs at its own rate however
+    fast (or whether) the page renders.
+
+    The live view is a throttled JPEG preview (`preview_fps`, `preview_width`,
+    `preview_quality`): only frames due for display are annotated and encoded.
+    With `mjpeg_port` it is also served as MJPEG on localhost.
+
+    The page must call heartbeat() while it shows the session (the polling fragment
+    does); without one for `idle_timeout` seconds, e.g. after the tab was closed,
+    the worker stops itself and releases the camera. When the camera cannot be
+    opened or stops delivering frames, the worker ends with `error` set; either
+    way `running` turns False and the page has to replace the session.
+    """
+
+    def __init__(self, driver, trip_id, log_event, camera=0, pipelined=True, reuse_buffers=True,
+                 on_alerts=None, debug_yawn=False, preview_fps=10.0, preview_width=640, preview_quality=70,
+                 mjpeg_port=None, idle_timeout=10.0, **monitor_options):
+        self.driver = driver
+        self.trip_id = trip_id
+        self.log_event = log_event
+        self.camera = camera
+        self.pipelined = pipelined
+        self.reuse_buffers = reuse_buffers
+        self.on_alerts = on_alerts
+        self.debug_yawn = debug_yawn
+        self.monitor_options = dict(monitor_options, reuse_buffers=reuse_buffers)
+        self.idle_timeout = idle_timeout
+        self.monitor = None
+        self.episodes = EpisodeTracker(log_event)
+        self.error = None
+        self.preview = PreviewEncoder(fps=preview_fps, max_width=preview_width, quality=preview_quality)
+        self.mjpeg = None
+        self.mjpeg_error = None
+        if mjpeg_port:
+            try:
+                self.mjpeg = MjpegServer(self.preview, port=mjpeg_port)
+            except OSError as e:
+                # Port taken (e.g. by another session); the in-page preview still works
+                self.mjpeg_error = e
+        self._lock = threading.Lock()
+        self._state = {'seq': 0, 'alerts': dict.fromkeys(ALERT_TYPES, False), 'yawn_debug': []}
+        self._stop = threading.Event()
+        self._thread = None
+        self._pipeline = None
+        self._heartbeat = time.monotonic()
+        self._started_at = None
+        self._frames = 0
+
+    def start(self):
+        self._stop.clear()
+        self._started_at = time.time()
+        self._heartbeat = time.monotonic()
+        if self.mjpeg is not None:
+            # Before the worker, which shuts the server down when it exits
+            self.mjpeg.start()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        threading.Thread(target=self._watchdog, daemon=True).start()
+        return self
+
+    def heartbeat(self):
+        """Called by the page while it is displaying the session."""
+        self._heartbeat = time.monotonic()
+
+    def _halt(self):
+        self._stop.set()
+        pipeline = self._pipeline
+        if pipeline is not None:
+            # Ends the capture, so the worker is not left waiting for a frame
+            pipeline.capture.stop()
+
+    def _watchdog(self):
+        while not self._stop.wait(1.0):
+            if time.monotonic() - self._heartbeat > self.idle_timeout:
+                self._halt()
+
+    def stop(self):
+        """Stop monitoring; returns once the camera is released and the models are back in their pool."""
+        self._halt()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        cap = cv2.VideoCapture(self.camera)
+        try:
+            if not cap.isOpened():
+                raise IOError(f"could not open camera {self.camera}")
+            with StreamMonitor(**self.monitor_options) as monitor:
+                self.monitor = monitor
+                # A frame takes a flip buffer only when the detector picks it up, so at most
+                # four are in flight (being analyzed, two queued, being rendered); 8 is ample
+                flip_ring = BufferRing(8)
+                mirror = (lambda f: flip_into(f, flip_ring)) if self.reuse_buffers else (lambda f: cv2.flip(f, 1))
+                if self.pipelined:
+                    # Capture and detection each run on their own stage, this thread logs and publishes
+                    with FramePipeline(cap, monitor.analyze, transform=mirror) as pipeline:
+                        self._pipeline = pipeline
+                        if self._stop.is_set():
+                            pipeline.capture.stop()
+                        for frame, result in pipeline:
+                            self._handle(frame, result)
+                            if self._stop.is_set():
+                                break
+                else:
+                    while cap.isOpened() and not self._stop.is_set():
+                        ret, frame = cap.read()
+                        if not ret:
+                            break
+                        frame = mirror(frame)
+                        self._handle(frame, monitor.analyze(frame))
+            if not self._stop.is_set():
+                raise IOError(f"camera {self.camera} stopped delivering frames")
+        except Exception as e:
+            self.error = e
+        finally:
+            cap.release()
+            self.episodes.close()
+            if self.mjpeg is not None:
+                # Frees the port however the worker ended, including the idle watchdog
+                self.mjpeg.stop()
+
+    def _handle(self, frame, result):
+        events = frame_events(result, self.driver, self.trip_id, debug_yawn=self.debug_yawn)
+        self.episodes.update(events, time.time())
+        alerts = dict.fromkeys(ALERT_TYPES, False)
+        for event in events:
+            alerts[_EVENT_ALERTS[event['event_type']]] = True
+        if self.on_alerts is not None:
+            self.on_alerts(alerts)
+        if self.preview.due():
+            # Detection is done with the frame, so the overlays can go on it in place
+            self.preview.encode(draw_overlays(frame, result, alerts))
+        yawn_debug = [face['yawn'][1:] for face in result['faces']] if self.debug_yawn else []
+        self._frames += 1
+        with self._lock:
+            self._state = {
+                'seq': self._state['seq'] + 1,
+                'alerts': alerts,
+                'yawn_debug': yawn_debug,
+            }
+
+    def snapshot(self):
+        """
+        Latest published state: {'seq', 'alerts', 'yawn_debug'}, the newest preview
+        as 'preview_seq' and 'jpeg' (bytes or None), plus run stats.
+        """
+        with self._lock:
+            state = dict(self._state)
+        state['preview_seq'], state['jpeg'] = self.preview.latest()
+        elapsed = time.time() - self._started_at if self._started_at else 0.0
+        state['fps'] = self._frames / elapsed if elapsed > 0 else 0.0
+        state['running'] = self.running
+        state['error'] = self.error
+        return state
@@ -0,0 +1,133 @@
+import itertools
+import time
+
+import cv2
+import numpy as np
+
+
+def box_iou(a, b):
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def centroid_distance(a, b):
+    """Distance between box centres, relative to the diagonal of box a."""
+    diag = np.hypot(a[2] - a[0], a[3] - a[1])
+    dx = (a[0] + a[2] - b[0] - b[2]) / 2.0
+    dy = (a[1] + a[3] - b[1] - b[3]) / 2.0
+    return np.hypot(dx, dy) / diag if diag > 0 else np.inf
+
+
+class PhoneTrack:
+    """A phone box kept alive between detector runs."""
+
+    def __init__(self, track_id, box, confidence, ts):
+        self.track_id = track_id
+        self.box = tuple(box)
+        self.confidence = confidence
+        self.first_seen = ts
+        self.last_confirmed = ts
+        self.hits = 1
+        self.template = None
+
+    @property
+    def duration(self):
+        return self.last_confirmed - self.first_seen
+
+    def __repr__(self):
+        return f"PhoneTrack(id={self.track_id}, box={tuple(round(v) for v in self.box)}, conf={self.confidence:.2f})"
+
+
+class PhoneTracker:
+    """
+    IoU/centroid tracker for phone boxes. Frames with detector output confirm,
+    move or create tracks; frames without it (detector skipped) move each track
+    by template matching in a small search window around its last box. A track
+    that goes unconfirmed by the detector for `max_unconfirmed` seconds is dropped.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_centroid_distance=0.75, max_unconfirmed=1.5,
+                 search_margin=0.5, min_match_score=0.5):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_unconfirmed = max_unconfirmed
+        self.search_margin = search_margin
+        self.min_match_score = min_match_score
+        self.tracks = []
+        self._ids = itertools.count(1)
+
+    def update(self, frame, detections=None, ts=None):
+        """
+        Advance the tracker by one frame.
+        detections: list of (x1, y1, x2, y2, confidence) from the detector, or None
+        if the detector did not run on this frame. Returns the live tracks.
+        """
+        ts = time.time() if ts is None else ts
+        gray = None
+        if self.tracks or detections:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        if detections is None:
+            for track in self.tracks:
+                self._follow(track, gray)
+        else:
+            self._associate(detections, gray, ts)
+        self.tracks = [t for t in self.tracks if ts - t.last_confirmed <= self.max_unconfirmed]
+        return list(self.tracks)
+
+    def _associate(self, detections, gray, ts):
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            for di, det in enumerate(detections):
+                overlap = box_iou(track.box, det[:4])
+                distance = centroid_distance(track.box, det[:4])
+                if overlap >= self.iou_threshold or distance <= self.max_centroid_distance:
+                    pairs.append((overlap, -distance, ti, di))
+        pairs.sort(reverse=True)
+        matched_tracks, matched_dets = set(), set()
+        for _, _, ti, di in pairs:
+            if ti in matched_tracks or di in matched_dets:
+                continue
+            matched_tracks.add(ti)
+            matched_dets.add(di)
+            track = self.tracks[ti]
+            track.box = tuple(detections[di][:4])
+            track.confidence = detections[di][4]
+            track.last_confirmed = ts
+            track.hits += 1
+            self._set_template(track, gray)
+        for di, det in enumerate(detections):
+            if di not in matched_dets:
+                track = PhoneTrack(next(self._ids), det[:4], det[4], ts)
+                self._set_template(track, gray)
+                self.tracks.append(track)
+
+    def _set_template(self, track, gray):
+        h, w = gray.shape[:2]
+        x1, y1, x2, y2 = (int(round(v)) for v in track.box)
+        x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            track.template = None
+            return
+        track.template = gray[y1:y2, x1:x2].copy()
+        track.box = (x1, y1, x2, y2)
+
+    def _follow(self, track, gray):
+        if track.template is None:
+            return
+        th, tw = track.template.shape
+        x1, y1 = int(track.box[0]), int(track.box[1])
+        mx, my = int(tw * self.search_margin) + 1, int(th * self.search_margin) + 1
+        h, w = gray.shape[:2]
+        sx1, sy1 = max(0, x1 - mx), max(0, y1 - my)
+        sx2, sy2 = min(w, x1 + tw + mx), min(h, y1 + th + my)
+        window = gray[sy1:sy2, sx1:sx2]
+        if window.shape[0] < th or window.shape[1] < tw:
+            return
+        scores = cv2.matchTemplate(window, track.template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (bx, by) = cv2.minMaxLoc(scores)
+        if best >= self.min_match_score:
+            nx, ny = sx1 + bx, sy1 + by
+            track.box = (nx, ny, nx + tw, ny + th)
@@ -1,4 +1,11 @@
 import numpy as np
+from detector.base import BaseDetector, stack_faces, split_faces
+
+UPPER_LIP = [13, 14, 15, 16]
+LOWER_LIP = [17, 18, 19, 20]
+# Landmarks read by is_yawning (lips and the normalisation pair)
+YAWN_LANDMARKS = [9, 10] + UPPER_LIP + LOWER_LIP
+YAWN_RATIO_THRESHOLD = 0.30
 
 def is_yawning(landmarks, debug=False):
     """
@@ -8,18 +15,16 @@ def is_yawning(landmarks, debug=False):
     """
     try:
         # Upper lip landmarks (average)
-        upper_lip_indices = [13, 14, 15, 16]
-        upper_lip = np.mean([landmarks[i] for i in upper_lip_indices], axis=0)
+        upper_lip = np.mean([landmarks[i] for i in UPPER_LIP], axis=0)
         # Lower lip landmarks (average)
-        lower_lip_indices = [17, 18, 19, 20]
-        lower_lip = np.mean([landmarks[i] for i in lower_lip_indices], axis=0)
+        lower_lip = np.mean([landmarks[i] for i in LOWER_LIP], axis=0)
         # Mouth opening
         mouth_distance = np.linalg.norm(upper_lip - lower_lip)
         # Face width for normalization (cheek to cheek)
         face_width = np.linalg.norm(landmarks[10] - landmarks[9])
         if face_width > 0:
             mouth_ratio = mouth_distance / face_width
-            is_yawn = mouth_ratio > 0.30
+            is_yawn = mouth_ratio > YAWN_RATIO_THRESHOLD
         else:
             mouth_ratio = 0
             is_yawn = mouth_distance > 50
@@ -29,4 +34,36 @@ def is_yawning(landmarks, debug=False):
     except (IndexError, ValueError, TypeError):
         if debug:
             return False, 0, 0, 0
-        return False
\ No newline at end of file
+        return False
+
+
+def mouth_ratio_batch(landmarks, threshold=YAWN_RATIO_THRESHOLD):
+    """
+    Vectorized is_yawning for (N, 478, 2) landmark arrays.
+    Returns arrays (is_yawn, mouth_ratio, mouth_distance, face_width), each of length N.
+    """
+    landmarks = np.asarray(landmarks)
+    upper_lip = landmarks[:, UPPER_LIP].mean(axis=1)
+    lower_lip = landmarks[:, LOWER_LIP].mean(axis=1)
+    mouth_distance = np.linalg.norm(upper_lip - lower_lip, axis=-1)
+    face_width = np.linalg.norm(landmarks[:, 10] - landmarks[:, 9], axis=-1)
+    valid = face_width > 0
+    mouth_ratio = np.divide(mouth_distance, face_width, out=np.zeros_like(mouth_distance), where=valid)
+    is_yawn = np.where(valid, mouth_ratio > threshold, mouth_distance > 50)
+    return is_yawn, mouth_ratio, mouth_distance, face_width
+
+
+class YawnDetector(BaseDetector):
+    """is_yawning debug tuples (is_yawn, mouth_ratio, mouth_distance, face_width), one per face."""
+    name = 'yawn'
+
+    def process(self, frame, landmarks, ts):
+        return [is_yawning(lm, debug=True) for lm in landmarks]
+
+    def process_batch(self, frames, landmarks, timestamps):
+        stacked, counts = stack_faces(landmarks)
+        if stacked is None:
+            return [[] for _ in counts]
+        columns = mouth_ratio_batch(stacked)
+        rows = [(bool(y), float(r), float(d), float(w)) for y, r, d, w in zip(*columns)]
+        return split_faces(rows, counts)
@@ -1,47 +1,108 @@
 import numpy as np
 import wave
-import struct
+from functools import lru_cache
 
-def generate_alarm_sound(filename="alert.wav", duration=3, sample_rate=44100):
+SAMPLE_RATE = 44100
+
+
+def _to_int16(wave_data, volume, sample_rate, fade=0.1):
+    """Fade in/out to prevent clicking, scale to `volume` and convert to 16-bit samples"""
+    fade_samples = min(int(fade * sample_rate), len(wave_data) // 2)
+    if fade_samples:
+        ramp = np.linspace(0, 1, fade_samples)
+        wave_data[:fade_samples] *= ramp
+        wave_data[-fade_samples:] *= ramp[::-1]
+    return np.int16(wave_data * volume * 32767)
+
+
+def _tone(frequency, sample_rate):
+    """Sine wave following a per-sample frequency array, phase-continuous across changes"""
+    phase = 2 * np.pi * (np.cumsum(frequency) - frequency[0]) / sample_rate
+    return np.sin(phase)
+
+
+def siren(duration=3, low=800, high=1200, period=1.0, volume=0.5, sample_rate=SAMPLE_RATE):
     """
-    Generate a 3-second alarm sound with alternating high and low frequency tones
+    Tone alternating between `low` and `high` Hz, each held for half a `period`
+    (the original alert.wav sound)
     """
-    # Create time array
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    
-    # Create alternating frequency pattern (like a siren)
-    frequency1 = 800  # Hz
-    frequency2 = 1200  # Hz
-    
-    # Create the waveform - alternating between two frequencies every 0.5 seconds
-    wave_data = np.zeros_like(t)
-    
-    for i, time_val in enumerate(t):
-        # Alternate frequency every 0.5 seconds
-        if int(time_val * 2) % 2 == 0:
-            wave_data[i] = np.sin(2 * np.pi * frequency1 * time_val)
-        else:
-            wave_data[i] = np.sin(2 * np.pi * frequency2 * time_val)
-    
-    # Apply envelope to prevent clicking
-    envelope = np.ones_like(wave_data)
-    fade_samples = int(0.1 * sample_rate)  # 0.1 second fade
-    envelope[:fade_samples] = np.linspace(0, 1, fade_samples)
-    envelope[-fade_samples:] = np.linspace(1, 0, fade_samples)
-    
-    wave_data *= envelope
-    
-    # Normalize and convert to 16-bit integers
-    wave_data = np.int16(wave_data * 32767 * 0.5)  # 50% volume
-    
-    # Save as WAV file
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    frequency = np.where((t * 2 / period).astype(np.int64) % 2 == 0, low, high)
+    return _to_int16(_tone(frequency, sample_rate), volume, sample_rate)
+
+
+def beep(duration=3, frequency=1000, on=0.2, off=0.2, volume=0.5, sample_rate=SAMPLE_RATE):
+    """`frequency` Hz beeps of `on` seconds separated by `off` seconds of silence"""
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    wave_data = np.sin(2 * np.pi * frequency * t)
+    position = np.mod(t, on + off)
+    # Short ramps on each beep edge avoid clicks
+    edge = min(0.01, on / 4)
+    gate = np.clip(np.minimum(position, on - position) / edge, 0, 1)
+    return _to_int16(wave_data * gate, volume, sample_rate, fade=0.0)
+
+
+def escalating(duration=3, start_frequency=600, end_frequency=1400, start_rate=2, end_rate=8,
+               start_volume=0.2, end_volume=0.8, sample_rate=SAMPLE_RATE):
+    """
+    Beeps that get higher, faster and louder over `duration`: pitch, beeps per
+    second and loudness ramp linearly from their start to their end values
+    """
+    n = int(sample_rate * duration)
+    progress = np.linspace(0, 1, n)
+    frequency = start_frequency + (end_frequency - start_frequency) * progress
+    rate = start_rate + (end_rate - start_rate) * progress
+    # On for the first half of every beep cycle, cycles counted with the changing rate
+    cycles = np.cumsum(rate) / sample_rate
+    gate = (np.mod(cycles, 1.0) < 0.5).astype(np.float64)
+    loudness = start_volume + (end_volume - start_volume) * progress
+    return _to_int16(_tone(frequency, sample_rate) * gate * loudness, 1.0, sample_rate, fade=0.01)
+
+
+PATTERNS = {
+    'siren': siren,
+    'beep': beep,
+    'escalating': escalating,
+}
+
+# Distinct tone per alert type for the alarm service
+ALERT_TONES = {
+    'drowsiness': {'pattern': 'escalating'},
+    'phone': {'pattern': 'beep', 'frequency': 1000, 'on': 0.15, 'off': 0.15},
+    'yawning': {'pattern': 'siren', 'low': 600, 'high': 900, 'volume': 0.4},
+}
+
+
+@lru_cache(maxsize=64)
+def _cached_tone(pattern, params):
+    samples = PATTERNS[pattern](**dict(params))
+    # Shared between callers, so it must not be modified in place
+    samples.flags.writeable = False
+    return samples
+
+
+def alarm_tone(pattern='siren', **params):
+    """
+    Read-only int16 mono samples for a pattern ('siren', 'beep', 'escalating'),
+    cached in-process by pattern and parameters
+    """
+    return _cached_tone(pattern, tuple(sorted(params.items())))
+
+
+def write_wav(samples, filename, sample_rate=SAMPLE_RATE):
     with wave.open(filename, 'w') as wav_file:
         wav_file.setnchannels(1)  # Mono
         wav_file.setsampwidth(2)  # 2 bytes per sample
         wav_file.setframerate(sample_rate)
-        wav_file.writeframes(wave_data.tobytes())
-    
+        wav_file.writeframes(samples.tobytes())
+
+
+def generate_alarm_sound(filename="alert.wav", duration=3, sample_rate=44100):
+    """
+    Generate a 3-second alarm sound with alternating high and low frequency tones
+    """
+    write_wav(alarm_tone('siren', duration=duration, sample_rate=sample_rate), filename, sample_rate)
     print(f"Alarm sound saved as {filename}")
 
 if __name__ == "__main__":
-    generate_alarm_sound()
\ No newline at end of file
+    generate_alarm_sound()
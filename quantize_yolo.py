@@ -0,0 +1,139 @@
+# quantize_yolo.py
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+from detector.backends import ONNX_PATH, ONNX_INT8_PATH, COCO_CELL_PHONE, OnnxBackend, letterbox
+from detector.tracker import box_iou
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def list_images(folder):
+    return sorted(p for p in glob.glob(os.path.join(folder, '*')) if p.lower().endswith(IMAGE_EXTENSIONS))
+
+
+class CabinFrameReader(CalibrationDataReader):
+    """Feeds letterboxed cabin frames to the quantization calibrator."""
+
+    def __init__(self, folder, input_name, imgsz=640, limit=300):
+        self.paths = list_images(folder)[:limit]
+        if not self.paths:
+            raise FileNotFoundError(f"No calibration images found in {folder}")
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self._index = 0
+
+    def get_next(self):
+        while self._index < len(self.paths):
+            image = cv2.imread(self.paths[self._index])
+            self._index += 1
+            if image is not None:
+                padded, _, _ = letterbox(image, self.imgsz)
+                return {self.input_name: cv2.dnn.blobFromImage(padded, 1 / 255.0, swapRB=True)}
+        return None
+
+    def rewind(self):
+        self._index = 0
+
+
+def quantize(model_path, output_path, calib_folder, imgsz=640, limit=300, keep_head_fp32=True):
+    """
+    Post-training static INT8 quantization (QDQ, per-channel weights) of an exported
+    YOLOv8 ONNX model, calibrated on our own cabin frames. The Detect head (box decoding
+    and class scores) is left in float by default since it is the most sensitive part.
+    """
+    import onnx
+    model = onnx.load(model_path)
+    input_name = model.graph.input[0].name
+    # Exported node names look like /model.22/cv3.0/...; the highest block is the Detect head
+    blocks = [int(n.name.split('/')[1].split('.')[1]) for n in model.graph.node if n.name.startswith('/model.')]
+    head = f"/model.{max(blocks)}/" if blocks else None
+    exclude = [n.name for n in model.graph.node if keep_head_fp32 and head and n.name.startswith(head)]
+    reader = CabinFrameReader(calib_folder, input_name, imgsz, limit)
+    quantize_static(
+        model_path, output_path, reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        nodes_to_exclude=exclude,
+    )
+    print(f"Calibrated on {len(reader.paths)} frames, {len(exclude)} head nodes kept in float")
+    print(f"Quantized model saved as {output_path}")
+
+
+def load_labels(label_path, image_shape, phone_class):
+    """Phone boxes from a YOLO-format label file (class cx cy w h, normalized)."""
+    h, w = image_shape[:2]
+    boxes = []
+    if os.path.exists(label_path):
+        with open(label_path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 5 and int(parts[0]) == phone_class:
+                    cx, cy, bw, bh = (float(v) for v in parts[1:])
+                    boxes.append(((cx - bw / 2) * w, (cy - bh / 2) * h, (cx + bw / 2) * w, (cy + bh / 2) * h))
+    return boxes
+
+
+def evaluate(backend, image_folder, label_folder, phone_class=COCO_CELL_PHONE, conf=0.5, iou_match=0.5):
+    """Cell phone precision/recall at IoU 0.5 and mean latency on a labeled set."""
+    tp = fp = fn = 0
+    latencies = []
+    for path in list_images(image_folder):
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        truth = load_labels(os.path.join(label_folder, name + '.txt'), image.shape, phone_class)
+        start = time.perf_counter()
+        detections = backend.detect(image, conf=conf)
+        latencies.append(time.perf_counter() - start)
+        predicted = [d[:4] for d in detections if backend.names.get(d[5]) == 'cell phone']
+        for box in truth:
+            best = max(predicted, key=lambda p: box_iou(box, p), default=None)
+            if best is not None and box_iou(box, best) >= iou_match:
+                tp += 1
+                predicted.remove(best)
+            else:
+                fn += 1
+        fp += len(predicted)
+    return {
+        'precision': tp / (tp + fp) if tp + fp else 0.0,
+        'recall': tp / (tp + fn) if tp + fn else 0.0,
+        'latency_ms': 1000 * float(np.mean(latencies[1:] or latencies)) if latencies else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="INT8-quantize the phone detector and report accuracy/speed")
+    parser.add_argument('--calib', required=True, help="folder of cabin frames used for calibration")
+    parser.add_argument('--model', default=ONNX_PATH, help="exported float ONNX model (python -m detector.backends export)")
+    parser.add_argument('--output', default=ONNX_INT8_PATH)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--limit', type=int, default=300, help="max calibration frames")
+    parser.add_argument('--quantize-head', action='store_true', help="also quantize the Detect head")
+    parser.add_argument('--eval-images', help="labeled images for the accuracy check")
+    parser.add_argument('--eval-labels', help="YOLO-format label folder (defaults to --eval-images)")
+    parser.add_argument('--phone-class', type=int, default=COCO_CELL_PHONE, help="phone class id in the labels")
+    args = parser.parse_args()
+
+    quantize(args.model, args.output, args.calib, args.imgsz, args.limit, keep_head_fp32=not args.quantize_head)
+
+    if args.eval_images:
+        labels = args.eval_labels or args.eval_images
+        results = {}
+        for title, path in (('float32', args.model), ('int8', args.output)):
+            results[title] = evaluate(OnnxBackend(path, imgsz=args.imgsz), args.eval_images, labels, args.phone_class)
+            r = results[title]
+            print(f"{title:>8}: precision {r['precision']:.3f}  recall {r['recall']:.3f}  {r['latency_ms']:.1f} ms/frame")
+        fp32, int8 = results['float32'], results['int8']
+        print(f"   delta: precision {int8['precision'] - fp32['precision']:+.3f}  "
+              f"recall {int8['recall'] - fp32['recall']:+.3f}  "
+              f"speedup {fp32['latency_ms'] / int8['latency_ms']:.2f}x")